@@ -33,8 +33,9 @@ app.config.from_object(Config)
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
-from app import routes, result_model, errors
+from app import routes, result_model, errors, database, scheduling, metrics
 
 app.redis = Redis.from_url(app.config['REDIS_URL'])
-app.queue = rq.Queue('qiskit-runtime-handler', connection=app.redis, default_timeout=3600)
+app.queues = {lane: rq.Queue(queueName, connection=app.redis, default_timeout=3600)
+              for lane, queueName in scheduling.laneQueues.items()}
 app.logger.setLevel(logging.DEBUG)
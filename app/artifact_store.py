@@ -0,0 +1,108 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import os
+import tempfile
+
+from app import app
+
+# artifacts of a result and the suffixes of the corresponding file names
+artifactSuffixes = {'program': '-program.zip', 'agent': '-agent.zip'}
+
+
+class FilesystemArtifactStore(object):
+    """Store for artifacts in a local or shared folder, which are addressed by the hash of their content, so that
+    identical artifacts are only stored once"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get_path(self, contentHash):
+        """Get the path of the artifact with the given hash, using the first characters to spread the artifacts"""
+        return os.path.join(self.directory, contentHash[:2], contentHash + '.zip')
+
+    def put_artifact(self, data):
+        """Store the given artifact unless it is already available and get its hash"""
+        contentHash = get_content_hash(data)
+        path = self.get_path(contentHash)
+        if os.path.exists(path):
+            # mark the artifact as recently used, so that it is not removed by the retention sweeper
+            app.logger.info('Artifact already stored: ' + contentHash)
+            os.utime(path)
+            return contentHash
+
+        # write to a temporary file first, so that concurrent readers never see partially written artifacts
+        app.logger.info('Storing artifact: ' + contentHash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fileDescriptor, temporaryPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fileDescriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temporaryPath, path)
+        finally:
+            if os.path.exists(temporaryPath):
+                os.remove(temporaryPath)
+        return contentHash
+
+    def get_artifact(self, contentHash):
+        """Get the artifact with the given hash as path to stream it from or None if it is not available"""
+        path = self.get_path(contentHash)
+        if not os.path.exists(path):
+            return None
+        return path
+
+    def touch_artifact(self, contentHash):
+        """Mark the artifact with the given hash as recently used, so that it is not removed by the retention sweeper,
+        and check if it is available"""
+        try:
+            os.utime(self.get_path(contentHash))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def read_artifact(self, contentHash):
+        """Get the content of the artifact with the given hash"""
+        with open(self.get_path(contentHash), 'rb') as file:
+            return file.read()
+
+
+# stores for the artifacts of the results, further stores have to provide the same methods
+artifactStores = {'filesystem': lambda: FilesystemArtifactStore(app.config['RESULT_FOLDER'])}
+
+
+def get_artifact_store():
+    """Get the configured artifact store"""
+    storeName = app.config['ARTIFACT_STORE']
+    if storeName not in artifactStores:
+        raise Exception('Unknown artifact store: ' + str(storeName))
+    return artifactStores[storeName]()
+
+
+def get_content_hash(data):
+    """Get the hash of the given artifact, which is used as its address and strong ETag"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_file_name(name):
+    """Get the result ID and artifact of the given file name or None if it does not belong to a result"""
+    for artifact, suffix in artifactSuffixes.items():
+        if name.endswith(suffix):
+            return name[:-len(suffix)], artifact
+    return None
@@ -0,0 +1,104 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import threading
+import time
+
+from app import app
+
+# Redis channel on which the workers publish the IDs of completed results
+completionChannel = 'qiskit-runtime-handler:completed'
+
+# events of the requests waiting in this process by the IDs of the results they wait for
+waitingRequests = {}
+waitingRequestsLock = threading.Lock()
+listenerThread = None
+
+# set while the subscription of this process to the completion events is active
+listenerSubscribed = threading.Event()
+
+
+def publish_completion(resultId):
+    """Notify all waiting requests that the result with the given ID is complete"""
+    app.redis.publish(completionChannel, resultId)
+
+
+def wait_for_completion(resultId, timeout, get_status):
+    """Wait until the result with the given ID is complete or the timeout passed and get its status using the given
+    function, which returns None for unknown results"""
+    start_listener()
+    deadline = time.monotonic() + timeout
+    event = threading.Event()
+    with waitingRequestsLock:
+        waitingRequests.setdefault(resultId, []).append(event)
+    try:
+        # check the status once the subscription is active, so that no completion event is missed
+        if not listenerSubscribed.wait(timeout):
+            return get_status()
+        status = get_status()
+        if status is None or status['complete']:
+            return status
+        event.wait(max(0.0, deadline - time.monotonic()))
+        return get_status()
+    finally:
+        with waitingRequestsLock:
+            waitingRequests[resultId].remove(event)
+            if not waitingRequests[resultId]:
+                del waitingRequests[resultId]
+
+
+def start_listener():
+    """Start the single subscription of this process to the completion events unless it is already running"""
+    global listenerThread
+    with waitingRequestsLock:
+        if listenerThread is None or not listenerThread.is_alive():
+            listenerThread = threading.Thread(target=listen, name='completion-listener', daemon=True)
+            listenerThread.start()
+
+
+def listen():
+    """Forward completion events to all requests waiting for the corresponding result"""
+    while True:
+        pubSub = app.redis.pubsub()
+        try:
+            pubSub.subscribe(completionChannel)
+            for message in pubSub.listen():
+                if message['type'] == 'subscribe':
+                    listenerSubscribed.set()
+                elif message['type'] == 'message':
+                    notify(message['data'].decode('utf-8'))
+        except Exception as error:
+            app.logger.error('Subscription to completion events failed: ' + str(error))
+            listenerSubscribed.clear()
+
+            # events may have been missed, so let all waiting requests check the status of their result again
+            with waitingRequestsLock:
+                for events in waitingRequests.values():
+                    for event in events:
+                        event.set()
+            time.sleep(1)
+        finally:
+            pubSub.close()
+
+
+def notify(resultId):
+    """Wake up all requests waiting for the result with the given ID"""
+    with waitingRequestsLock:
+        for event in waitingRequests.get(resultId, []):
+            event.set()
@@ -26,6 +26,108 @@ class Config(object):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # journal mode of SQLite databases, WAL allows reading while another process writes, and time in milliseconds to
+    # wait for locks held by other processes
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL'
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 30000)
+
+    # connection pool of other databases, e.g., PostgreSQL, whose connections are checked before they are used
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE') or 5)
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW') or 10)
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE') or 1800)
+    DATABASE_POOL_PRE_PING = (os.environ.get('DATABASE_POOL_PRE_PING') or 'true').lower() == 'true'
+    if SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT / 1000}}
+    else:
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': DATABASE_POOL_SIZE,
+                                     'max_overflow': DATABASE_MAX_OVERFLOW,
+                                     'pool_recycle': DATABASE_POOL_RECYCLE,
+                                     'pool_pre_ping': DATABASE_POOL_PRE_PING}
+
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://'
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or os.path.join(basedir, 'files')
-    RESULT_FOLDER = os.environ.get('RESULT_FOLDER') or os.path.join(basedir, 'generated-files')
\ No newline at end of file
+    RESULT_FOLDER = os.environ.get('RESULT_FOLDER') or os.path.join(basedir, 'generated-files')
+
+    # time in seconds since their last use after which uploaded files and generated artifacts are removed and maximum
+    # sizes in bytes of the folders, exceeding files are removed in least recently used order (0 disables)
+    UPLOAD_RETENTION = int(os.environ.get('UPLOAD_RETENTION') or 86400)
+    UPLOAD_FOLDER_MAX_SIZE = int(os.environ.get('UPLOAD_FOLDER_MAX_SIZE') or 10 * 1024 * 1024 * 1024)
+    RESULT_RETENTION = int(os.environ.get('RESULT_RETENTION') or 30 * 86400)
+    RESULT_FOLDER_MAX_SIZE = int(os.environ.get('RESULT_FOLDER_MAX_SIZE') or 10 * 1024 * 1024 * 1024)
+
+    # interval in seconds in which the folders are swept (0 disables), and time in seconds after which left over
+    # temporary files are removed
+    RETENTION_INTERVAL = int(os.environ.get('RETENTION_INTERVAL') or 3600)
+    TEMPORARY_FILE_RETENTION = int(os.environ.get('TEMPORARY_FILE_RETENTION') or 3600)
+
+    # maximum size in bytes of an uploaded file comprising required programs, and of the body of requests, which are
+    # rejected while reading them if the body is larger, batch requests with several files may require a larger body
+    MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE') or 100 * 1024 * 1024)
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or MAX_UPLOAD_SIZE + 1024 * 1024)
+
+    # store for the generated programs and agents, the 'filesystem' store uses the RESULT_FOLDER
+    ARTIFACT_STORE = os.environ.get('ARTIFACT_STORE') or 'filesystem'
+
+    # hand off of uploaded files to the workers ('http', 'volume' if UPLOAD_FOLDER is shared with the workers, or
+    # 'redis'), and time to live in seconds of uploaded files stored in Redis
+    UPLOAD_HANDOFF = os.environ.get('UPLOAD_HANDOFF') or 'http'
+    UPLOAD_HANDOFF_TTL = int(os.environ.get('UPLOAD_HANDOFF_TTL') or 86400)
+
+    # number of uploaded files whose programs are kept in memory by each worker to reuse them for later jobs
+    TASK_PROGRAMS_CACHE_SIZE = int(os.environ.get('TASK_PROGRAMS_CACHE_SIZE') or 32)
+
+    # engine to analyse and rewrite the task programs if not defined by the request ('redbaron' or 'libcst')
+    CODE_ENGINE = os.environ.get('CODE_ENGINE') or 'redbaron'
+
+    # maximum number of cached generation results (0 disables the cache) and their time to live in seconds
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE') or 1000)
+    RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL') or 86400)
+
+    # time to live in seconds of the cached analysis results of task programs shared by all workers (0 disables)
+    ANALYSIS_CACHE_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL') or 604800)
+
+    # number of processes analysing the task programs of a job in parallel
+    ANALYSIS_PROCESSES = int(os.environ.get('ANALYSIS_PROCESSES') or os.cpu_count() or 1)
+
+    # time to live in seconds of the status of running jobs cached in Redis (0 disables) and maximum number of results
+    # per bulk status request
+    STATUS_CACHE_TTL = int(os.environ.get('STATUS_CACHE_TTL') or 86400)
+    MAX_STATUS_IDS = int(os.environ.get('MAX_STATUS_IDS') or 1000)
+
+    # estimated duration in seconds of generation jobs, consisting of a base cost and costs per task and per megabyte
+    # of the uploaded programs, and maximum estimated duration of jobs in the interactive lane
+    JOB_COST_BASE = float(os.environ.get('JOB_COST_BASE') or 5)
+    JOB_COST_PER_TASK = float(os.environ.get('JOB_COST_PER_TASK') or 3)
+    JOB_COST_PER_MEGABYTE = float(os.environ.get('JOB_COST_PER_MEGABYTE') or 2)
+    INTERACTIVE_MAX_COST = float(os.environ.get('INTERACTIVE_MAX_COST') or 30)
+
+    # job timeouts in seconds as multiple of the estimated duration, bounded by a minimum and the maximum of each lane,
+    # the estimation is not reliable for large programs, so no job gets less than the former fixed timeout by default,
+    # i.e., interactive jobs have a fixed timeout on purpose and only the timeouts of bulk jobs depend on their cost
+    # unless the minimum is lowered
+    JOB_TIMEOUT_FACTOR = float(os.environ.get('JOB_TIMEOUT_FACTOR') or 20)
+    MIN_JOB_TIMEOUT = int(os.environ.get('MIN_JOB_TIMEOUT') or 18000)
+    INTERACTIVE_JOB_TIMEOUT = int(os.environ.get('INTERACTIVE_JOB_TIMEOUT') or 18000)
+    BULK_JOB_TIMEOUT = int(os.environ.get('BULK_JOB_TIMEOUT') or 72000)
+
+    # number of bytes the memory of a warm worker process may grow by before it is replaced by a new process
+    WORKER_MAX_MEMORY_GROWTH = int(os.environ.get('WORKER_MAX_MEMORY_GROWTH') or 512 * 1024 * 1024)
+
+    # record metrics of requests and jobs in Redis to export them for Prometheus
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or 'true').lower() == 'true'
+
+    # fraction of jobs profiled without being requested, number of frames stored per memory allocation, and number of
+    # entries of the reports contained in the profiles
+    PROFILE_SAMPLING_RATE = float(os.environ.get('PROFILE_SAMPLING_RATE') or 0)
+    PROFILE_TRACEBACK_LIMIT = int(os.environ.get('PROFILE_TRACEBACK_LIMIT') or 1)
+    PROFILE_REPORT_ENTRIES = int(os.environ.get('PROFILE_REPORT_ENTRIES') or 50)
+
+    # maximum number of candidates per batch request
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE') or 100)
+
+    # maximum time in seconds a request waits for the completion of a result
+    MAX_WAIT_TIMEOUT = int(os.environ.get('MAX_WAIT_TIMEOUT') or 60)
+
+    # maximum number of bytes read from uploaded ZIP files and maximum nesting depth of ZIP files within them
+    MAX_EXTRACTED_BYTES = int(os.environ.get('MAX_EXTRACTED_BYTES') or 100 * 1024 * 1024)
+    MAX_ARCHIVE_DEPTH = int(os.environ.get('MAX_ARCHIVE_DEPTH') or 5)
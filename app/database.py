@@ -0,0 +1,39 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app
+
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapiConnection, connectionRecord):
+    """Configure the journal mode and busy timeout of new SQLite connections"""
+    if isinstance(dbapiConnection, sqlite3.Connection):
+        cursor = dbapiConnection.cursor()
+        cursor.execute('PRAGMA journal_mode=' + app.config['SQLITE_JOURNAL_MODE'])
+        cursor.execute('PRAGMA busy_timeout=' + str(app.config['SQLITE_BUSY_TIMEOUT']))
+
+        # WAL is consistent after crashes without synchronizing each transaction
+        if app.config['SQLITE_JOURNAL_MODE'].upper() == 'WAL':
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
@@ -18,6 +18,7 @@
 # ******************************************************************************
 
 from flask import make_response, jsonify
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
 from app import app
 
 
@@ -31,6 +32,19 @@ def not_found(error):
     return make_response(jsonify({'error': 'Not found', 'statusCode': '404'}), 404)
 
 
+@app.errorhandler(413)
+def request_entity_too_large(error):
+    # details given when aborting, e.g., the exceeded limit, are returned to the client
+    body = {'error': 'Request Entity Too Large', 'statusCode': '413'}
+    if error.description != RequestEntityTooLarge.description:
+        body['message'] = error.description
+    return make_response(jsonify(body), 413)
+
+
 @app.errorhandler(400)
 def bad_request(error):
-    return make_response(jsonify({'error': 'Bad Request', 'statusCode': '400'}), 400)
+    # details given when aborting, e.g., the invalid candidate of a batch, are returned to the client
+    body = {'error': 'Bad Request', 'statusCode': '400'}
+    if error.description != BadRequest.description:
+        body['message'] = error.description
+    return make_response(jsonify(body), 400)
@@ -0,0 +1,67 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import json
+
+from app import app
+
+# Redis keys of the cache for the program fragments resulting from the analysis of task programs
+analysisCachePrefix = 'qiskit-runtime-handler:analysis-cache:'
+analysisCacheHits = analysisCachePrefix + 'hits'
+analysisCacheMisses = analysisCachePrefix + 'misses'
+
+# version of the program fragments, which has to be increased whenever the analysis of the engines or the format of
+# the fragments changes, so that fragments of previous deployments are not reused
+analysisVersion = 1
+
+
+def get_cache_key(sourceCode, prefix, engineName):
+    """Get the key of the program fragment for the given program and prefix"""
+    return analysisCachePrefix + 'v' + str(analysisVersion) + ':' + engineName + ':' + prefix + ':' \
+        + hashlib.sha256(sourceCode.encode('utf-8')).hexdigest()
+
+
+def load_program_fragment(sourceCode, prefix, engineName):
+    """Get the program fragment for the given program and prefix from the cache shared by all workers if the program
+    was analysed before"""
+    if app.config['ANALYSIS_CACHE_TTL'] <= 0:
+        return None
+
+    cachedFragment = app.redis.get(get_cache_key(sourceCode, prefix, engineName))
+    if cachedFragment is not None:
+        app.logger.info('Reusing cached analysis of program for task with ID: ' + prefix)
+        app.redis.incr(analysisCacheHits)
+        return json.loads(cachedFragment)
+
+    app.redis.incr(analysisCacheMisses)
+    return None
+
+
+def store_program_fragment(sourceCode, prefix, engineName, programFragment):
+    """Store the program fragment for the given program and prefix in the cache shared by all workers"""
+    cacheTtl = app.config['ANALYSIS_CACHE_TTL']
+    if cacheTtl > 0:
+        app.redis.set(get_cache_key(sourceCode, prefix, engineName), json.dumps(programFragment), ex=cacheTtl)
+
+
+def get_statistics():
+    """Get the number of cache hits and cache misses"""
+    return {'hits': int(app.redis.get(analysisCacheHits) or 0),
+            'misses': int(app.redis.get(analysisCacheMisses) or 0)}
@@ -0,0 +1,40 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+from app import app
+from app.hybrid_program_generation import method_handler, cst_method_handler
+
+# engines to analyse and rewrite the programs of the tasks, all returning the same program fragments
+codeEngines = {'redbaron': method_handler.analyse_program,
+               'libcst': cst_method_handler.analyse_program}
+
+
+def get_code_engine(engineName):
+    """Get the name of the engine to use, i.e., the given engine or the configured default engine"""
+    if not engineName:
+        engineName = app.config['CODE_ENGINE']
+    if engineName not in codeEngines:
+        raise Exception('Unknown code engine: ' + str(engineName))
+    app.logger.info('Using code engine: ' + engineName)
+    return engineName
+
+
+def analyse_program(sourceCode, fileName, prefix, engineName):
+    """Analyse the given program with the given engine and get the resulting program fragment"""
+    return codeEngines[engineName](sourceCode, fileName, prefix)
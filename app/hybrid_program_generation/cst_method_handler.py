@@ -0,0 +1,558 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import libcst as cst
+
+from app import app
+from app.hybrid_program_generation.method_handler import is_native_reference
+from app.hybrid_program_generation.symbol_table import SymbolTable
+
+
+class ProgramIndex(cst.CSTVisitor):
+    """Collect imports, methods and assignments of a program in the order of their occurrence"""
+
+    def __init__(self, module):
+        super().__init__()
+        self.module = module
+        self.importNodes = []
+        self.fromImportNodes = []
+        self.defNodes = []
+        self.assignmentNodes = []
+
+        # blank lines and comments following a method, which RedBaron considers as part of the method
+        self.trailingLines = {}
+
+        # indentation of nested methods, which RedBaron keeps when extracting a method
+        self.indentations = [""]
+        self.methodIndentations = {}
+
+    def visit_Import(self, node):
+        self.importNodes.append(node)
+
+    def visit_ImportFrom(self, node):
+        self.fromImportNodes.append(node)
+
+    def visit_FunctionDef(self, node):
+        self.defNodes.append(node)
+        self.methodIndentations[node] = self.indentations[-1]
+
+    def visit_Assign(self, node):
+        self.assignmentNodes.append(node)
+
+    def visit_AugAssign(self, node):
+        self.assignmentNodes.append(node)
+
+    def visit_AnnAssign(self, node):
+        if node.value:
+            self.assignmentNodes.append(node)
+
+    def visit_Module(self, node):
+        self.add_trailing_lines(node.body, node.footer)
+
+    def visit_IndentedBlock(self, node):
+        self.add_trailing_lines(node.body, ())
+        self.indentations.append(self.indentations[-1] + (self.module.default_indent
+                                                          if node.indent is None else node.indent))
+
+    def leave_IndentedBlock(self, original_node):
+        self.indentations.pop()
+
+    def add_trailing_lines(self, body, footer):
+        for position, statement in enumerate(body):
+            if isinstance(statement, cst.FunctionDef):
+                if position + 1 < len(body):
+                    self.trailingLines[statement] = body[position + 1].leading_lines
+                else:
+                    self.trailingLines[statement] = footer
+
+
+class AssignmentCollector(cst.CSTVisitor):
+    """Collect all assignments within a method, including nested blocks"""
+
+    def __init__(self):
+        super().__init__()
+        self.assignmentNodes = []
+
+    def visit_Assign(self, node):
+        self.assignmentNodes.append(node)
+
+    def visit_AugAssign(self, node):
+        self.assignmentNodes.append(node)
+
+    def visit_AnnAssign(self, node):
+        if node.value:
+            self.assignmentNodes.append(node)
+
+
+class NameCollector(cst.CSTVisitor):
+    """Collect the values of all name nodes"""
+
+    def __init__(self):
+        super().__init__()
+        self.names = []
+
+    def visit_Name(self, node):
+        self.names.append(node.value)
+
+
+class MethodRewriter(cst.CSTTransformer):
+    """Apply the modifications collected during the analysis to a method"""
+
+    def __init__(self, analysis):
+        super().__init__()
+        self.analysis = analysis
+
+    def leave_FunctionDef(self, original_node, updated_node):
+        methodState = self.analysis.methodStates.get(original_node)
+        if methodState is None:
+            return updated_node
+
+        parameters = updated_node.params
+        if methodState['addedParameters']:
+            addedParameters = [cst.Param(cst.Name(name)) for name in methodState['addedParameters']]
+            parameters = parameters.with_changes(params=list(parameters.params) + addedParameters)
+        return updated_node.with_changes(name=cst.Name(methodState['name']), params=parameters)
+
+    def leave_Assign(self, original_node, updated_node):
+        return self.update_assignment(original_node, updated_node)
+
+    def leave_AugAssign(self, original_node, updated_node):
+        return self.update_assignment(original_node, updated_node)
+
+    def leave_AnnAssign(self, original_node, updated_node):
+        return self.update_assignment(original_node, updated_node)
+
+    def update_assignment(self, original_node, updated_node):
+        if original_node in self.analysis.assignmentValues:
+            return updated_node.with_changes(value=self.analysis.assignmentValues[original_node])
+        return updated_node
+
+
+class ProgramAnalysis(object):
+    """State of the analysis of one program, i.e., the modifications to apply and the code of the added methods"""
+
+    def __init__(self, module, prefix):
+        self.module = module
+        self.prefix = prefix
+        self.programIndex = ProgramIndex(module)
+        module.visit(self.programIndex)
+
+        # current values of modified assignments and names/parameters of modified methods
+        self.assignmentValues = {}
+        self.methodStates = {}
+
+        # symbol table for the merged methods, as well as the methods and explicitly imported names of the program
+        importedNames = [importAlias.name.value for importNode in self.programIndex.fromImportNodes
+                         if not isinstance(importNode.names, cst.ImportStar)
+                         for importAlias in importNode.names if isinstance(importAlias.name, cst.Name)]
+        self.symbolTable = SymbolTable(self.programIndex.defNodes, importedNames, self.get_method_name,
+                                       self.get_bound_names)
+
+    def get_value(self, assignmentNode):
+        """Get the current value of the given assignment"""
+        return self.assignmentValues.get(assignmentNode, assignmentNode.value)
+
+    def get_method_state(self, methodNode):
+        """Get the current name and parameters of the given method"""
+        if methodNode not in self.methodStates:
+            self.methodStates[methodNode] = {'name': methodNode.name.value,
+                                             'parameters': get_parameter_names(methodNode),
+                                             'addedParameters': []}
+        return self.methodStates[methodNode]
+
+    def get_method_name(self, methodNode):
+        if methodNode in self.methodStates:
+            return self.methodStates[methodNode]['name']
+        return methodNode.name.value
+
+    def get_bound_names(self, methodNode):
+        """Get the names of the parameters and the variables assigned in the given method"""
+        boundNames = set(self.get_method_state(methodNode)['parameters'])
+        assignmentCollector = AssignmentCollector()
+        methodNode.visit(assignmentCollector)
+        for assignmentNode in assignmentCollector.assignmentNodes:
+            for target in get_targets(assignmentNode):
+
+                # if assignment has name node on the left side, the name of the variable is bound
+                if isinstance(target, cst.Name):
+                    boundNames.add(target.value)
+
+                # if assignment has tuple node on the left, each entry is bound
+                if isinstance(target, cst.Tuple):
+                    nameCollector = NameCollector()
+                    target.visit(nameCollector)
+                    boundNames.update(nameCollector.names)
+
+        return boundNames
+
+    def append_parameter(self, methodNode, parameterName):
+        methodState = self.get_method_state(methodNode)
+        methodState['parameters'].append(parameterName)
+        methodState['addedParameters'].append(parameterName)
+
+    def dumps(self, methodNode):
+        """Get the code of the given method with all modifications applied so far"""
+        rewrittenNode = methodNode.visit(MethodRewriter(self)).with_changes(leading_lines=())
+
+        # nested methods keep the indentation of their body like in RedBaron
+        indentation = self.programIndex.methodIndentations[methodNode]
+        if indentation and isinstance(rewrittenNode.body, cst.IndentedBlock):
+            bodyIndentation = self.module.default_indent if rewrittenNode.body.indent is None \
+                else rewrittenNode.body.indent
+            rewrittenNode = rewrittenNode.with_changes(
+                body=rewrittenNode.body.with_changes(indent=indentation + bodyIndentation))
+        methodCode = cst.Module(body=[rewrittenNode], default_indent=self.module.default_indent,
+                                default_newline=self.module.default_newline).code
+
+        # add following blank lines and comments, as well as the indentation of the next statement in the block
+        trailingLines = self.programIndex.trailingLines.get(methodNode, ())
+        if trailingLines:
+            methodCode += cst.Module(body=[], header=trailingLines, default_newline=self.module.default_newline).code
+        if indentation and methodNode in self.programIndex.trailingLines:
+            methodCode += indentation
+        return methodCode
+
+
+def analyse_program(sourceCode, fileName, prefix):
+    """Analyse the given program using libcst and get the execute method, as well as all dependent code, with the
+    method names prefixed by the given prefix"""
+    analysis = ProgramAnalysis(cst.parse_module(sourceCode), prefix)
+    programIndex = analysis.programIndex
+
+    # get all imports from the file
+    imports = [dumps_import(analysis.module, importNode) for importNode in programIndex.importNodes]
+    imports.extend([dumps_import(analysis.module, importNode) for importNode in programIndex.fromImportNodes])
+
+    # find the methods within the file that end with 'execute'
+    executeNodes = [node for node in programIndex.defNodes if node.name.value.endswith('execute')]
+
+    # if not found abort the generation
+    if len(executeNodes) != 1:
+        raise Exception('Unable to find execute method in program: ' + fileName)
+    executeNode = executeNodes[0]
+
+    # get the output parameters for the given program
+    outputParameterList = get_output_parameters_of_execute(analysis)
+    if outputParameterList is None:
+        raise Exception('Unable to retrieve output parameters of execute method in program: ' + fileName)
+
+    # collect the code of the execute method and all depending methods
+    methodName, inputParameterList, signatureExtendedWithBackend, signatureExtendedIndices = add_method_recursively(
+        analysis,
+        executeNode)
+
+    return {'methodName': methodName,
+            'inputParameters': inputParameterList,
+            'outputParameters': outputParameterList,
+            'imports': imports,
+            'methods': analysis.symbolTable.get_merged_methods()}
+
+
+def add_method_recursively(analysis, methodNode):
+    """Add the code of the given method node and all dependent methods, i.e., called methods to the analysis."""
+    methodName = analysis.get_method_name(methodNode)
+    app.logger.info('Recursively adding methods. Current method name: ' + methodName)
+
+    # get assignment nodes and check if they call local methods
+    assignmentCollector = AssignmentCollector()
+    methodNode.visit(assignmentCollector)
+    assignmentNodes = assignmentCollector.assignmentNodes
+
+    # replace all calls of qiskit.execute in this method to use the Qiskit Runtime backend
+    signatureExtendedWithBackend, parameterName, backendSignaturePositions = replace_qiskit_execute(analysis,
+                                                                                                    assignmentNodes,
+                                                                                                    methodNode)
+
+    # iterate over all assignment nodes and check if they rely on a local method call
+    for assignmentNode in assignmentNodes:
+
+        # we assume local calls always provide only one name node
+        atomTrailers = get_atom_trailers(analysis.get_value(assignmentNode))
+        if len(atomTrailers) < 2 or not isinstance(atomTrailers[1], cst.Call) \
+                or not isinstance(atomTrailers[0], cst.Name):
+            continue
+
+        # extract the name of the local method that is called
+        calledMethodName = atomTrailers[0].value
+
+        # check if the method was already added
+        if analysis.symbolTable.contains_method(analysis.prefix + '_' + calledMethodName):
+            rename_called_method(analysis, assignmentNode, analysis.prefix + '_' + calledMethodName)
+            continue
+
+        # filter native primitives that are referenced
+        if is_native_reference(calledMethodName):
+            continue
+
+        # check if the method was imported explicitly
+        if analysis.symbolTable.is_imported(calledMethodName):
+            continue
+
+        # find method node in the current file
+        recursiveMethodNode = analysis.symbolTable.find_method(calledMethodName)
+        if not recursiveMethodNode:
+            raise Exception('Unable to find method in program that is referenced: ' + calledMethodName)
+
+        # update invocation with new method name
+        app.logger.info('Found new method invocation of local method: ' + calledMethodName)
+        addedMethodName, inputParameterList, signatureExtended, backendSignaturePositionsNew = add_method_recursively(
+            analysis,
+            recursiveMethodNode)
+        rename_called_method(analysis, assignmentNode, addedMethodName)
+
+        # handle backend objects in called method
+        if backendSignaturePositionsNew:
+            app.logger.info('Added method defined backend as parameter at positions: ' + str(backendSignaturePositionsNew))
+            for backendSignaturePosition in backendSignaturePositionsNew:
+                callNode = get_atom_trailers(analysis.get_value(assignmentNode))[1]
+                parameter = callNode.args[backendSignaturePosition]
+                extended, indices, parameterName = check_qiskit_backend_assignment(analysis, methodNode,
+                                                                                   assignmentNodes,
+                                                                                   parameterName,
+                                                                                   backendSignaturePositions,
+                                                                                   get_name(analysis.module,
+                                                                                            parameter.value))
+                for index in indices:
+                    if index not in backendSignaturePositions:
+                        backendSignaturePositions.append(index)
+
+        # check if the signature of the invoked method was extended by the Qiskit Runtime backend
+        if signatureExtended:
+            app.logger.info('Extending method invocation due to extended method signature!')
+
+            # generate parameter name for the current method if not already done
+            if not parameterName:
+                parameterName = get_unused_method_parameter(analysis, 'backend', methodNode)
+                app.logger.info('Qiskit Runtime backend not yet available as variable in this method. '
+                                'Adding with name: ' + parameterName)
+
+                # append to method signature
+                analysis.append_parameter(methodNode, parameterName)
+
+            # extend the method invocation with the new parameter
+            analysis.assignmentValues[assignmentNode] = update_head_call(
+                analysis.get_value(assignmentNode),
+                lambda call: call.with_changes(args=list(call.args) + [cst.Arg(cst.Name(parameterName))]))
+            signatureExtendedWithBackend = True
+
+    # add prefix for corresponding file to the method name to avoid name clashes when merging multiple files
+    methodState = analysis.get_method_state(methodNode)
+    methodState['name'] = analysis.prefix + '_' + methodState['name']
+
+    # determine input parameters of the method
+    inputParameterList = list(methodState['parameters'])
+
+    # add the current state of the method to the added methods
+    analysis.symbolTable.add_method(methodState['name'], analysis.dumps(methodNode))
+    return methodState['name'], inputParameterList, signatureExtendedWithBackend, backendSignaturePositions
+
+
+def replace_qiskit_execute(analysis, assignmentNodes, methodNode):
+    """Search for a qiskit.execute() command which has to be replaced by backend.run() for Qiskit Runtime"""
+    app.logger.info('Checking for qiskit.execute call in method: ' + analysis.get_method_name(methodNode))
+
+    name = None
+    signatureExtensionRequired = False
+    backendSignaturePositions = []
+    for assignmentNode in assignmentNodes:
+
+        # call to qiskit.execute consists of at least two name nodes (qiskit, execute) and one call node
+        atomTrailers = get_atom_trailers(analysis.get_value(assignmentNode))
+        if len(atomTrailers) < 3:
+            continue
+
+        # first node must be a name node with value qiskit
+        if not isinstance(atomTrailers[0], cst.Name) or atomTrailers[0].value != 'qiskit':
+            continue
+
+        # second node must be a name node with value execute
+        if not isinstance(atomTrailers[1], cst.Name) or atomTrailers[1].value != 'execute':
+            continue
+
+        # third node must be a call node
+        if not isinstance(atomTrailers[2], cst.Call):
+            continue
+        callNode = atomTrailers[2]
+
+        # circuit to execute is explicitly defined under the 'experiments' parameters or the first positional argument
+        circuitArgument = find_call_argument(callNode, 'experiments', 0)
+
+        # backend to use is explicitly defined under the 'backend' parameters or the second positional argument
+        backendArgument = find_call_argument(callNode, 'backend', 1)
+        if not isinstance(circuitArgument, cst.Name) or not isinstance(backendArgument, cst.Name):
+            raise Exception('Unable to retrieve circuit and backend variable names for qiskit.execute() in method: '
+                            + analysis.get_method_name(methodNode))
+        app.logger.info('Backend variable name for qiskit.execute(): ' + backendArgument.value)
+
+        # check if backend is assigned locally
+        signatureExtension, backendSignaturePositions, name = check_qiskit_backend_assignment(analysis,
+                                                                                              methodNode,
+                                                                                              assignmentNodes,
+                                                                                              name,
+                                                                                              backendSignaturePositions,
+                                                                                              backendArgument.value)
+        if signatureExtension:
+            # signature must be extended to pass the backend
+            signatureExtensionRequired = True
+
+        # replace the call with the qiskit runtime backend call
+        app.logger.info('Replacing qiskit.execute with call to Qiskit Runtime backend in method: '
+                        + analysis.get_method_name(methodNode))
+        analysis.assignmentValues[assignmentNode] = cst.parse_expression(
+            backendArgument.value + ".run(" + circuitArgument.value + ")")
+
+    return signatureExtensionRequired, name, backendSignaturePositions
+
+
+def get_unused_method_parameter(analysis, prefix, methodNode):
+    """Get a variable name that was not already used in the given method using the given prefix"""
+    return analysis.symbolTable.get_unused_name(methodNode, prefix)
+
+
+def get_output_parameters_of_execute(analysis):
+    """Get the set of output parameters of an execute method within a program"""
+
+    # get the invocation of the execute method to extract the output parameters
+    invokeExecuteNode = None
+    for assignmentNode in analysis.programIndex.assignmentNodes:
+        atomTrailers = get_atom_trailers(assignmentNode.value)
+        if len(atomTrailers) == 2 and isinstance(atomTrailers[0], cst.Name) \
+                and atomTrailers[0].value.endswith('execute'):
+            invokeExecuteNode = assignmentNode
+            break
+
+    # generation has to be aborted if retrieval of output parameters fails
+    if not invokeExecuteNode:
+        return None
+
+    # only one output parameter
+    target = get_targets(invokeExecuteNode)[0]
+    if isinstance(target, cst.Name):
+        return [target.value]
+    else:
+        # set of output parameters
+        return [get_name(analysis.module, element.value) for element in target.elements]
+
+
+def check_qiskit_backend_assignment(analysis, methodNode, assignmentNodes, backendName, backendSignaturePositions,
+                                    variableName):
+    """Check if the Qiskit backend for a circuit execution is assigned locally or in the method signature"""
+
+    backendAssignment = next((assignmentNode for assignmentNode in assignmentNodes
+                              if isinstance(get_targets(assignmentNode)[0], cst.Name)
+                              and get_targets(assignmentNode)[0].value == variableName), None)
+    if backendAssignment:
+
+        if not backendName:
+            backendName = get_unused_method_parameter(analysis, 'backend', methodNode)
+            app.logger.info('Qiskit Runtime backend not yet available as variable in this method. '
+                            'Adding with name: ' + backendName)
+
+            # append to method signature
+            analysis.append_parameter(methodNode, backendName)
+
+        # instead pass Qiskit Runtime backend as parameter
+        analysis.assignmentValues[backendAssignment] = cst.Name(backendName)
+
+        # signature must be extended to pass the backend
+        return True, backendSignaturePositions, backendName
+    else:
+        app.logger.info('Searching for parameter ' + variableName + ' within method signature')
+
+        # check if backend is passed through the signature
+        parameterNames = analysis.get_method_state(methodNode)['parameters']
+        if variableName in parameterNames:
+            # get position within the signature
+            backendSignaturePosition = parameterNames.index(variableName)
+            if backendSignaturePosition not in backendSignaturePositions:
+                backendSignaturePositions.append(backendSignaturePosition)
+        else:
+            app.logger.error(
+                'Backend used for qiskit.execute neither defined as method parameter nor as local variable!')
+        return False, backendSignaturePositions, None
+
+
+def rename_called_method(analysis, assignmentNode, methodName):
+    """Update the name of the local method called within the given assignment"""
+    analysis.assignmentValues[assignmentNode] = update_head_call(
+        analysis.get_value(assignmentNode),
+        lambda call: call.with_changes(func=call.func.with_changes(value=methodName)))
+
+
+def update_head_call(expression, update):
+    """Apply the given update to the call of the first name node within the given expression"""
+    if isinstance(expression, cst.Call):
+        if isinstance(expression.func, cst.Name):
+            return update(expression)
+        return expression.with_changes(func=update_head_call(expression.func, update))
+    if isinstance(expression, (cst.Attribute, cst.Subscript)):
+        return expression.with_changes(value=update_head_call(expression.value, update))
+    return expression
+
+
+def get_atom_trailers(expression):
+    """Get the atom and the trailers of the given expression comparable to the AtomtrailersNode of RedBaron"""
+    atomTrailers = []
+    while True:
+        if isinstance(expression, cst.Call):
+            atomTrailers.insert(0, expression)
+            expression = expression.func
+        elif isinstance(expression, cst.Attribute):
+            atomTrailers.insert(0, expression.attr)
+            expression = expression.value
+        elif isinstance(expression, cst.Subscript):
+            atomTrailers.insert(0, expression)
+            expression = expression.value
+        else:
+            atomTrailers.insert(0, expression)
+            return atomTrailers
+
+
+def find_call_argument(callNode, keyword, position):
+    """Get the value of the call argument with the given keyword or otherwise at the given position"""
+    for argument in callNode.args:
+        if argument.keyword and argument.keyword.value == keyword:
+            return argument.value
+    return callNode.args[position].value
+
+
+def get_targets(assignmentNode):
+    """Get the targets of the given assignment"""
+    if isinstance(assignmentNode, cst.Assign):
+        return [assignTarget.target for assignTarget in assignmentNode.targets]
+    return [assignmentNode.target]
+
+
+def get_parameter_names(methodNode):
+    """Get the names of all parameters of the given method that are no variadic parameters"""
+    parameters = methodNode.params
+    return [parameter.name.value for parameter in
+            list(parameters.posonly_params) + list(parameters.params) + list(parameters.kwonly_params)]
+
+
+def get_name(module, node):
+    """Get the name of the given node or its code if it is no name node"""
+    if isinstance(node, cst.Name):
+        return node.value
+    return module.code_for_node(node)
+
+
+def dumps_import(module, importNode):
+    """Get the code of the given import without a trailing semicolon"""
+    return module.code_for_node(importNode.with_changes(semicolon=cst.MaybeSentinel.DEFAULT))
@@ -18,30 +18,39 @@
 # ******************************************************************************
 
 import json
-import os
-import tempfile
-from os.path import basename
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 from app import app
-from redbaron import RedBaron
 
-from app.hybrid_program_generation.method_handler import get_output_parameters_of_execute, add_method_recursively
+from app.hybrid_program_generation.analysis_cache import load_program_fragment, store_program_fragment
+from app.hybrid_program_generation.code_engines import get_code_engine, analyse_program
+from app.hybrid_program_generation.import_index import ImportIndex
 from app.hybrid_program_generation.polling_agent_handler import generate_polling_agent
+from app.hybrid_program_generation.template_registry import get_template, templatesDirectory
 from app.hybrid_program_generation.zip_handler import zip_polling_agent, zip_runtime_program
+from app.stage_timings import StageTimings
 
 
-def create_hybrid_program(beforeLoop, afterLoop, loopCondition, taskIdProgramMap, provenanceCollection, jobId):
+def create_hybrid_program(beforeLoop, afterLoop, loopCondition, taskIdProgramMap, provenanceCollection, jobId,
+                          engine=None, timings=None):
     app.logger.info('Creating Qiskit Runtime program with tasks before loop: ' + str(beforeLoop))
     app.logger.info('Creating Qiskit Runtime program with tasks after loop: ' + str(afterLoop))
     app.logger.info('Adding statements for provenance collection: ' + str(provenanceCollection))
 
-    # directory containing all templates required for generation
-    templatesDirectory = os.path.join(os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__))),
-                                      'templates')
+    # engine used to analyse and rewrite the programs of the tasks
+    try:
+        engineName = get_code_engine(engine)
+    except Exception as error:
+        return {'error': str(error)}
+
+    # wall and CPU times of the stages of the generation
+    if timings is None:
+        timings = StageTimings()
 
     # RedBaron object containing all information about the hybrid program to generate
-    with open(os.path.join(templatesDirectory, 'qiskit_runtime_program.py'), "r") as source_code:
-        hybridProgramBaron = RedBaron(source_code.read())
+    with timings.measure('loadTemplate'):
+        hybridProgramBaron = get_template('qiskit_runtime_program.py')
 
     # retrieve all task names related to programs that have to be merged into the hybrid program
     taskNames = []
@@ -52,6 +61,19 @@ def create_hybrid_program(beforeLoop, afterLoop, loopCondition, taskIdProgramMap
         afterLoop = afterLoop.split(",")
         taskNames.extend(afterLoop)
 
+    # analyse the programs of all tasks independently of each other
+    with timings.measure('analysePrograms'):
+        programFragments = analyse_programs(taskNames, taskIdProgramMap, engineName, timings)
+
+    # index of the imports of the hybrid program and position of the last import of the template
+    importIndex = ImportIndex()
+    importListHybridProgram = hybridProgramBaron.find_all('import')
+    importListHybridProgram.extend(hybridProgramBaron.find_all('FromImportNode'))
+    importPosition = 0
+    for importNode in importListHybridProgram:
+        importIndex.add_existing_import(importNode.dumps())
+        importPosition = max(importPosition, hybridProgramBaron.index(importNode))
+
     # add methods from the given programs to the hybrid program
     programMetaData = {}
     app.logger.info('Adding programs for the following tasks: ' + str(taskNames))
@@ -60,9 +82,12 @@ def create_hybrid_program(beforeLoop, afterLoop, loopCondition, taskIdProgramMap
         if task not in taskIdProgramMap:
             return {'error': 'Unable to find program related to task with ID: ' + task}
         try:
-            hybridProgramBaron, methodName, inputParameterList, outputParameterList = handle_program(hybridProgramBaron,
-                                                                                                     taskIdProgramMap[
-                                                                                                         task], task)
+            with timings.measure('handleProgram', task):
+                hybridProgramBaron, methodName, inputParameterList, outputParameterList = handle_program(
+                    hybridProgramBaron,
+                    importIndex,
+                    taskIdProgramMap[task],
+                    programFragments[task])
             app.logger.info('Added methods for task with ID ' + task + '. Method name to call from root: ' + methodName)
             app.logger.info('Call requires input parameters: ' + str(inputParameterList))
             programMetaData[task] = {'methodName': methodName,
@@ -73,38 +98,37 @@ def create_hybrid_program(beforeLoop, afterLoop, loopCondition, taskIdProgramMap
             return {'error': 'Failed to analyse and incorporate Python file for task with ID ' + task + '!\n'
                              + str(error)}
 
+    # add the imports of all programs at once
+    importStatements = importIndex.dumps()
+    if importStatements:
+        hybridProgramBaron[importPosition:importPosition] = importStatements
+
     # generate the main method of the Qiskit Runtime program
     try:
         app.logger.info('Starting generation of main method for Qiskit Runtime program...')
-        hybridProgramBaron, inputParameters, outputParameters = generate_main_method(hybridProgramBaron, beforeLoop,
-                                                                                     afterLoop, loopCondition,
-                                                                                     programMetaData,
-                                                                                     provenanceCollection)
+        with timings.measure('generateMainMethod'):
+            hybridProgramBaron, inputParameters, outputParameters = generate_main_method(hybridProgramBaron,
+                                                                                         beforeLoop, afterLoop,
+                                                                                         loopCondition,
+                                                                                         programMetaData,
+                                                                                         provenanceCollection)
         app.logger.info('Successfully generated main method for Qiskit Runtime program...')
     except Exception as error:
         app.logger.error(error)
         return {'error': str(error)}
 
-    # write generated hybrid program code to result file
-    hybridProgramTemp = tempfile.NamedTemporaryFile(suffix=".py", delete=False)
-    with open(hybridProgramTemp.name, "w") as source_code:
-        source_code.write(hybridProgramBaron.dumps())
-
-    # generate meta data and write to file
-    metaDataTemp = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
-    with open(metaDataTemp.name, "w") as source_code:
-        source_code.write(generate_program_metadata(inputParameters, outputParameters))
-
-    # zip generated hybrid program and meta data files
-    hybridProgramData, fileName = zip_runtime_program(hybridProgramTemp, metaDataTemp)
-
-    # generate polling agent and write to file
-    pollingAgentTemp = tempfile.NamedTemporaryFile(suffix=".py", delete=False)
-    with open(pollingAgentTemp.name, "w") as source_code:
-        source_code.write(generate_polling_agent(inputParameters, outputParameters, jobId))
+    # zip generated hybrid program code and meta data
+    with timings.measure('dumpProgram'):
+        hybridProgramCode = hybridProgramBaron.dumps()
+    with timings.measure('zipProgram'):
+        hybridProgramData = zip_runtime_program(hybridProgramCode,
+                                                generate_program_metadata(inputParameters, outputParameters))
 
-    # zip polling agent
-    pollingAgentData = zip_polling_agent(templatesDirectory, pollingAgentTemp, fileName)
+    # generate and zip polling agent
+    with timings.measure('generatePollingAgent'):
+        pollingAgent = generate_polling_agent(inputParameters, outputParameters, jobId)
+    with timings.measure('zipPollingAgent'):
+        pollingAgentData = zip_polling_agent(templatesDirectory, pollingAgent, hybridProgramData)
 
     # return generated Qiskit Runtime program and corresponding polling agent
     result = {'program': hybridProgramData, 'agent': pollingAgentData}
@@ -232,51 +256,87 @@ def add_program_invocation(whileNode, requiredInputs, assignedVariables, task, p
     return whileNode, requiredInputs, assignedVariables
 
 
-def handle_program(hybridProgramBaron, path, task):
+def analyse_programs(taskNames, taskIdProgramMap, engineName, timings=None):
+    """Analyse the programs of the given tasks in a process pool and get the resulting program fragments or the
+    errors that occurred during the analysis by task"""
+    if timings is None:
+        timings = StageTimings()
+    programFragments = {}
+    sourceCodes = {}
+    for task in dict.fromkeys(taskNames):
+        if task not in taskIdProgramMap:
+            continue
+        sourceCode = taskIdProgramMap[task]['sourceCode']
+
+        # reuse a previous analysis of the same program if available
+        with timings.measure('loadAnalysis', task):
+            programFragment = load_program_fragment(sourceCode, task, engineName)
+        if programFragment is not None:
+            programFragments[task] = programFragment
+        else:
+            sourceCodes[task] = sourceCode
+
+    # the analysis of a program does not depend on other programs
+    processCount = min(app.config['ANALYSIS_PROCESSES'], len(sourceCodes))
+    app.logger.info('Analysing ' + str(len(sourceCodes)) + ' programs using ' + str(processCount) + ' processes')
+    if processCount > 1:
+        with ProcessPoolExecutor(max_workers=processCount) as executor:
+            futures = {task: executor.submit(measure_analysis, sourceCode, taskIdProgramMap[task]['fileName'], task,
+                                             engineName)
+                       for task, sourceCode in sourceCodes.items()}
+            for task, future in futures.items():
+                try:
+                    programFragments[task], wallTime, cpuTime = future.result()
+                    timings.add('analyseProgram', wallTime, cpuTime, task)
+                except Exception as error:
+                    programFragments[task] = error
+    else:
+        for task, sourceCode in sourceCodes.items():
+            programFragments[task], wallTime, cpuTime = measure_analysis(sourceCode,
+                                                                         taskIdProgramMap[task]['fileName'], task,
+                                                                         engineName)
+            timings.add('analyseProgram', wallTime, cpuTime, task)
+
+    # make successful analyses available for other jobs
+    for task, sourceCode in sourceCodes.items():
+        if not isinstance(programFragments[task], Exception):
+            store_program_fragment(sourceCode, task, engineName, programFragments[task])
+    return programFragments
+
+
+def measure_analysis(sourceCode, fileName, task, engineName):
+    """Analyse the given program and get the resulting program fragment or error with the wall and CPU time of the
+    analysis, which are measured in the process executing it"""
+    wallStart = time.perf_counter()
+    cpuStart = time.process_time()
+    try:
+        programFragment = analyse_program(sourceCode, fileName, task, engineName)
+    except Exception as error:
+        programFragment = error
+    return programFragment, time.perf_counter() - wallStart, time.process_time() - cpuStart
+
+
+def handle_program(hybridProgramBaron, importIndex, program, programFragment):
     """ Handle a program of the candidate and add the execute method,
-    as well as all dependent code to the given RedBaron object"""
+    as well as all dependent code to the given RedBaron object and the imports to the given import index"""
+
+    # analysis of the program failed
+    if isinstance(programFragment, Exception):
+        raise programFragment
 
     # separator between code snippets from different programs
     hybridProgramBaron.append('##############################################')
-    hybridProgramBaron.append('# Code snippets for file ' + basename(path))
+    hybridProgramBaron.append('# Code snippets for file ' + program['fileName'])
     hybridProgramBaron.append('##############################################')
 
-    with open(path, "r") as source_code:
-        taskFile = RedBaron(source_code.read())
-
-        # get all imports from the file
-        importListFile = taskFile.find_all('import')
-        importListFile.extend(taskFile.find_all('FromImportNode'))
-
-        # get last import node of the current RedBaron object
-        importListHybridProgram = hybridProgramBaron.find_all('import')
-        importListHybridProgram.extend(hybridProgramBaron.find_all('FromImportNode'))
-        index = 0
-        for i in importListHybridProgram:
-            index = max(index, hybridProgramBaron.index(i))
-
-        # for now all imports are added independent of their occurrence
-        hybridProgramBaron[index:index] = importListFile
-
-        # find the 'execute' method within the file
-        # find the methods within the file that end with 'execute'
-        executeNodes = [node for node in taskFile.find_all('def') if node.name.endswith('execute')]
-
-        # if not found abort the generation
-        if len(executeNodes) != 1:
-            raise Exception('Unable to find execute method in program: ' + basename(path))
-        executeNode = executeNodes[0]
-
-        # get the output parameters for the given program
-        outputParameterList = get_output_parameters_of_execute(taskFile)
-        if outputParameterList is None:
-            raise Exception('Unable to retrieve output parameters of execute method in program: ' + basename(path))
-
-        # add the execute method and all depending methods to the RedBaron object
-        methodName, inputParameterList, signatureExtendedWithBackend, signatureExtendedIndices = add_method_recursively(
-            hybridProgramBaron,
-            taskFile,
-            executeNode,
-            task)
-
-    return hybridProgramBaron, methodName, inputParameterList, outputParameterList
+    # imports are added to the hybrid program after all programs are handled
+    for importCode in programFragment['imports']:
+        importIndex.add_import(importCode)
+
+    # add the execute method and all depending methods to the RedBaron object
+    for method in programFragment['methods']:
+        hybridProgramBaron.append('\n')
+        hybridProgramBaron.append(method)
+
+    return hybridProgramBaron, programFragment['methodName'], programFragment['inputParameters'], \
+        programFragment['outputParameters']
@@ -0,0 +1,81 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import ast
+
+
+class ImportIndex(object):
+    """Index of the imports of the hybrid program, which normalizes the imports of all merged programs and keeps only
+    imports that are not already available"""
+
+    def __init__(self):
+        # imported names by normalized import statement, e.g., ('from', level, module) for 'from ... import ...'
+        self.importedNames = {}
+
+        # names that have to be added to the hybrid program by import statement in the order of their occurrence
+        self.addedNames = {}
+
+    def add_existing_import(self, importCode):
+        """Add an import which is already contained in the hybrid program"""
+        for statementKey, importedName in normalize_import(importCode):
+            self.importedNames.setdefault(statementKey, set()).add(importedName)
+
+    def add_import(self, importCode):
+        """Add an import of a merged program, which is ignored if the imported names are already available"""
+        for statementKey, importedName in normalize_import(importCode):
+            importedNames = self.importedNames.setdefault(statementKey, set())
+            if importedName not in importedNames:
+                importedNames.add(importedName)
+                self.addedNames.setdefault(statementKey, []).append(importedName)
+
+    def dumps(self):
+        """Get the code of all imports that have to be added to the hybrid program"""
+        importStatements = []
+        for statementKey, addedNames in self.addedNames.items():
+            if statementKey[0] == 'from':
+                importStatements.append('from ' + '.' * statementKey[1] + (statementKey[2] or '') + ' import '
+                                        + ', '.join(dumps_alias(name, asName) for name, asName in addedNames))
+            elif statementKey[0] == 'import':
+                importStatements.append('import ' + dumps_alias(statementKey[1], statementKey[2]))
+            else:
+                importStatements.append(statementKey[1])
+        return importStatements
+
+
+def normalize_import(importCode):
+    """Get the normalized import statements and imported names of the given import"""
+    try:
+        importNode = ast.parse(importCode.strip()).body[0]
+    except (SyntaxError, IndexError):
+        importNode = None
+
+    if isinstance(importNode, ast.Import):
+        return [(('import', alias.name, alias.asname), None) for alias in importNode.names]
+    if isinstance(importNode, ast.ImportFrom):
+        return [(('from', importNode.level, importNode.module), (alias.name, alias.asname))
+                for alias in importNode.names]
+
+    # keep imports that can not be normalized as they are
+    return [(('code', ' '.join(importCode.split())), None)]
+
+
+def dumps_alias(name, asName):
+    if asName:
+        return name + ' as ' + asName
+    return name
@@ -17,20 +17,64 @@
 #  limitations under the License.
 # ******************************************************************************
 
-import random
-
 from app import app
-
-
-def add_method_recursively(hybridProgramBaron, taskFile, methodNode, prefix):
-    """Add the given method node and all dependent methods, i.e., called methods to the given RedBaron object."""
+from app.hybrid_program_generation.symbol_table import SymbolTable
+from redbaron import RedBaron
+
+
+def analyse_program(sourceCode, fileName, prefix):
+    """Analyse the given program using RedBaron and get the execute method, as well as all dependent code, with the
+    method names prefixed by the given prefix"""
+    taskFile = RedBaron(sourceCode)
+
+    # get all imports from the file
+    fromImportListFile = taskFile.find_all('FromImportNode')
+    importListFile = taskFile.find_all('import')
+    importListFile.extend(fromImportListFile)
+
+    # find the methods within the file that end with 'execute'
+    methodNodes = taskFile.find_all('def')
+    executeNodes = [node for node in methodNodes if node.name.endswith('execute')]
+
+    # if not found abort the generation
+    if len(executeNodes) != 1:
+        raise Exception('Unable to find execute method in program: ' + fileName)
+    executeNode = executeNodes[0]
+
+    # get the output parameters for the given program
+    outputParameterList = get_output_parameters_of_execute(taskFile)
+    if outputParameterList is None:
+        raise Exception('Unable to retrieve output parameters of execute method in program: ' + fileName)
+
+    # symbol table for the methods and explicitly imported names of the file
+    importedNames = [nameNode.value for importNode in fromImportListFile
+                     for nameNode in importNode.targets.find_all('name_as_name')]
+    symbolTable = SymbolTable(methodNodes, importedNames, lambda node: node.name, get_bound_names)
+
+    # collect the code of the execute method and all depending methods
+    methodName, inputParameterList, signatureExtendedWithBackend, signatureExtendedIndices = add_method_recursively(
+        symbolTable,
+        executeNode,
+        prefix)
+
+    return {'methodName': methodName,
+            'inputParameters': inputParameterList,
+            'outputParameters': outputParameterList,
+            'imports': [importNode.dumps() for importNode in importListFile],
+            'methods': symbolTable.get_merged_methods()}
+
+
+def add_method_recursively(symbolTable, methodNode, prefix):
+    """Add the code of the given method node and all dependent methods, i.e., called methods to the merged methods
+    of the given symbol table."""
     app.logger.info('Recursively adding methods. Current method name: ' + methodNode.name)
 
     # get assignment nodes and check if they call local methods
     assignmentNodes = methodNode.find_all('assignment', recursive=True)
 
     # replace all calls of qiskit.execute in this method to use the Qiskit Runtime backend
-    signatureExtendedWithBackend, parameterName, backendSignaturePositions = replace_qiskit_execute(assignmentNodes,
+    signatureExtendedWithBackend, parameterName, backendSignaturePositions = replace_qiskit_execute(symbolTable,
+                                                                                                    assignmentNodes,
                                                                                                     methodNode)
 
     # iterate over all assignment nodes and check if they rely on a local method call
@@ -44,8 +88,8 @@ def add_method_recursively(hybridProgramBaron, taskFile, methodNode, prefix):
         # extract the name of the local method that is called
         calledMethodNameNode = assignmentValues.value[0]
 
-        # check if the method was already added to the RedBaron object
-        if len(hybridProgramBaron.find_all('def', name=prefix + '_' + calledMethodNameNode.value)):
+        # check if the method was already added
+        if symbolTable.contains_method(prefix + '_' + calledMethodNameNode.value):
             calledMethodNameNode.value = prefix + '_' + calledMethodNameNode.value
             continue
 
@@ -54,23 +98,18 @@ def add_method_recursively(hybridProgramBaron, taskFile, methodNode, prefix):
             continue
 
         # check if the method was imported explicitly
-        imported = False
-        for importNode in taskFile.find_all('FromImportNode'):
-            if len(importNode.targets.find_all('name_as_name', value=calledMethodNameNode.value)) > 0:
-                imported = True
-        if imported:
+        if symbolTable.is_imported(calledMethodNameNode.value):
             continue
 
         # find method node in the current file
-        recursiveMethodNode = taskFile.find('def', name=calledMethodNameNode.value)
+        recursiveMethodNode = symbolTable.find_method(calledMethodNameNode.value)
         if not recursiveMethodNode:
             raise Exception('Unable to find method in program that is referenced: ' + calledMethodNameNode.value)
 
         # update invocation with new method name
         app.logger.info('Found new method invocation of local method: ' + calledMethodNameNode.value)
         addedMethodName, inputParameterList, signatureExtended, backendSignaturePositionsNew = add_method_recursively(
-            hybridProgramBaron,
-            taskFile,
+            symbolTable,
             recursiveMethodNode,
             prefix)
         calledMethodNameNode.value = addedMethodName
@@ -80,7 +119,8 @@ def add_method_recursively(hybridProgramBaron, taskFile, methodNode, prefix):
             app.logger.info('Added method defined backend as parameter at positions: ' + str(backendSignaturePositionsNew))
             for backendSignaturePosition in backendSignaturePositionsNew:
                 parameter = assignmentValues.value[1].value[backendSignaturePosition]
-                extended, indices, parameterName = check_qiskit_backend_assignment(methodNode, assignmentNodes,
+                extended, indices, parameterName = check_qiskit_backend_assignment(symbolTable, methodNode,
+                                                                                   assignmentNodes,
                                                                                    parameterName,
                                                                                    backendSignaturePositions,
                                                                                    parameter.value.value)
@@ -94,7 +134,7 @@ def add_method_recursively(hybridProgramBaron, taskFile, methodNode, prefix):
 
             # generate parameter name for the current method if not already done
             if not parameterName:
-                parameterName = get_unused_method_parameter('backend', methodNode)
+                parameterName = get_unused_method_parameter(symbolTable, 'backend', methodNode)
                 app.logger.info('Qiskit Runtime backend not yet available as variable in this method. '
                                 'Adding with name: ' + parameterName)
 
@@ -114,13 +154,12 @@ def add_method_recursively(hybridProgramBaron, taskFile, methodNode, prefix):
     for inputParameterNode in inputParameterNodes:
         inputParameterList.append(inputParameterNode.target.value)
 
-    # add the method to the given RedBaron object
-    hybridProgramBaron.append('\n')
-    hybridProgramBaron.append(methodNode)
+    # add the current state of the method to the added methods
+    symbolTable.add_method(methodNode.name, methodNode.dumps())
     return methodNode.name, inputParameterList, signatureExtendedWithBackend, backendSignaturePositions
 
 
-def replace_qiskit_execute(assignmentNodes, methodNode):
+def replace_qiskit_execute(symbolTable, assignmentNodes, methodNode):
     """Search for a qiskit.execute() command which has to be replaced by backend.run() for Qiskit Runtime"""
     app.logger.info('Checking for qiskit.execute call in method: ' + methodNode.name)
 
@@ -178,7 +217,8 @@ def replace_qiskit_execute(assignmentNodes, methodNode):
         app.logger.info('Backend variable name for qiskit.execute(): ' + backendArgumentName.value)
 
         # check if backend is assigned locally
-        signatureExtension, backendSignaturePositions, name = check_qiskit_backend_assignment(methodNode,
+        signatureExtension, backendSignaturePositions, name = check_qiskit_backend_assignment(symbolTable,
+                                                                                              methodNode,
                                                                                               assignmentNodes,
                                                                                               name,
                                                                                               backendSignaturePositions,
@@ -194,30 +234,25 @@ def replace_qiskit_execute(assignmentNodes, methodNode):
     return signatureExtensionRequired, name, backendSignaturePositions
 
 
-def get_unused_method_parameter(prefix, methodNode):
+def get_unused_method_parameter(symbolTable, prefix, methodNode):
     """Get a variable name that was not already used in the given method using the given prefix"""
-    name = prefix
-    while True:
-        if methodNode.arguments.find('def_argument', target=lambda target: target and (target.value == name)) \
-                or check_if_variable_used(methodNode, name):
-            name = name + str(random.randint(0, 9))
-        else:
-            return name
+    return symbolTable.get_unused_name(methodNode, prefix)
 
 
-def check_if_variable_used(methodNode, name):
-    """Check if a variable with the given name is assigned in the given method"""
+def get_bound_names(methodNode):
+    """Get the names of the parameters and the variables assigned in the given method"""
+    boundNames = set(parameterNode.target.value for parameterNode in methodNode.arguments.find_all('def_argument'))
     for assignment in methodNode.find_all('assignment'):
 
-        # if assignment has name node on the left side, compare the name of the variable with the given name
-        if assignment.target.type == 'name' and assignment.target.value == name:
-            return True
+        # if assignment has name node on the left side, the name of the variable is bound
+        if assignment.target.type == 'name':
+            boundNames.add(assignment.target.value)
 
-        # if assignment has tuple node on the left, check each entry
-        if assignment.target.type == 'tuple' and assignment.target.find('name', value=name):
-            return True
+        # if assignment has tuple node on the left, each entry is bound
+        if assignment.target.type == 'tuple':
+            boundNames.update(nameNode.value for nameNode in assignment.target.find_all('name'))
 
-    return False
+    return boundNames
 
 
 def get_output_parameters_of_execute(taskFile):
@@ -241,14 +276,15 @@ def get_output_parameters_of_execute(taskFile):
         return [parameter.value for parameter in invokeExecuteNode.target.value]
 
 
-def check_qiskit_backend_assignment(methodNode, assignmentNodes, backendName, backendSignaturePositions, variableName):
+def check_qiskit_backend_assignment(symbolTable, methodNode, assignmentNodes, backendName, backendSignaturePositions,
+                                    variableName):
     """Check if the Qiskit backend for a circuit execution is assigned locally or in the method signature"""
 
     backendAssignment = find_element_with_name(assignmentNodes, 'assign', variableName)
     if backendAssignment:
 
         if not backendName:
-            backendName = get_unused_method_parameter('backend', methodNode)
+            backendName = get_unused_method_parameter(symbolTable, 'backend', methodNode)
             app.logger.info('Qiskit Runtime backend not yet available as variable in this method. '
                             'Adding with name: ' + backendName)
 
@@ -0,0 +1,79 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+class SymbolTable(object):
+    """Symbol table for the analysis of one program containing the merged methods, the methods and imported names of
+    the program, and the names bound within each method, so that no lookup requires to search the syntax tree"""
+
+    def __init__(self, methodNodes, importedNames, getMethodName, collectBoundNames):
+        self.getMethodName = getMethodName
+        self.collectBoundNames = collectBoundNames
+
+        # code of the merged methods by their name
+        self.mergedMethods = {}
+
+        # methods of the program by their original name in the order of their occurrence
+        self.methodNodes = {}
+        for methodNode in methodNodes:
+            self.methodNodes.setdefault(getMethodName(methodNode), []).append(methodNode)
+
+        # names explicitly imported by the program
+        self.importedNames = set(importedNames)
+
+        # names bound within the methods, i.e., parameters and assigned variables
+        self.boundNames = {}
+
+    def contains_method(self, methodName):
+        """Check if a method with the given name was already merged"""
+        return methodName in self.mergedMethods
+
+    def add_method(self, methodName, methodCode):
+        """Add the code of a merged method"""
+        self.mergedMethods[methodName] = methodCode
+
+    def get_merged_methods(self):
+        """Get the code of all merged methods in the order in which they were added"""
+        return list(self.mergedMethods.values())
+
+    def is_imported(self, name):
+        """Check if the given name was explicitly imported by the program"""
+        return name in self.importedNames
+
+    def find_method(self, methodName):
+        """Get the first method of the program that currently has the given name"""
+        for methodNode in self.methodNodes.get(methodName, []):
+            if self.getMethodName(methodNode) == methodName:
+                return methodNode
+        return None
+
+    def get_unused_name(self, methodNode, prefix):
+        """Get a name that is not bound within the given method using the given prefix and the lowest possible number
+        as suffix, so that the resulting name does not depend on the process executing the analysis"""
+        if methodNode not in self.boundNames:
+            self.boundNames[methodNode] = self.collectBoundNames(methodNode)
+        boundNames = self.boundNames[methodNode]
+
+        name = prefix
+        suffix = 0
+        while name in boundNames:
+            suffix += 1
+            name = prefix + str(suffix)
+        boundNames.add(name)
+        return name
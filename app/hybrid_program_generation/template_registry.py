@@ -0,0 +1,90 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import copy
+import hashlib
+import os
+import threading
+
+import baron
+from redbaron import RedBaron, base_nodes, nodes
+
+from app import app
+
+# directory containing all templates required for generation
+templatesDirectory = os.path.join(os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__))),
+                                  'templates')
+
+# parsed templates of this worker process, stored by template name
+templateCache = {}
+templateCacheLock = threading.Lock()
+
+
+class TemplateBaron(RedBaron):
+    """RedBaron object that is created from an already parsed FST instead of the source code.
+
+    Mirrors the initialization of RedBaron (redbaron==0.9.2) for source code without calling the parser."""
+
+    def __init__(self, fst):
+        self.first_blank_lines = []
+        self.node_list = base_nodes.NodeList.from_fst(fst, parent=self, on_attribute="root")
+        self.middle_separator = nodes.DotNode({"type": "endl", "formatting": [], "value": "\n", "indent": ""})
+
+        self.data = []
+        previous = None
+        for i in self.node_list:
+            if i.type != "endl":
+                self.data.append([i, []])
+            elif previous and previous.type == "endl":
+                self.data.append([previous, []])
+            elif previous is None and i.type == "endl":
+                self.data.append([i, []])
+            elif self.data:
+                self.data[-1][1].append(i)
+
+            previous = i
+        self.node_list.parent = None
+        self.on_attribute = None
+        self.parent = None
+
+
+def get_template(templateName):
+    """Get a RedBaron object for the template with the given name which can be modified independently of other jobs.
+
+    The template is only parsed again if its modification time and content changed since it was cached."""
+    path = os.path.join(templatesDirectory, templateName)
+    modificationTime = os.stat(path).st_mtime_ns
+
+    with templateCacheLock:
+        cacheEntry = templateCache.get(templateName)
+        if cacheEntry is None or cacheEntry['mtime'] != modificationTime:
+            with open(path, "r") as source_code:
+                source = source_code.read()
+            contentHash = hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+            # a touched but unchanged template can reuse the already parsed FST
+            if cacheEntry is None or cacheEntry['hash'] != contentHash:
+                app.logger.info('Parsing template: ' + str(templateName))
+                cacheEntry = {'hash': contentHash, 'fst': baron.parse(source)}
+            cacheEntry['mtime'] = modificationTime
+            templateCache[templateName] = cacheEntry
+        fst = cacheEntry['fst']
+
+    # the FST is plain data, so a deep copy results in a completely isolated RedBaron object
+    return TemplateBaron(copy.deepcopy(fst))
@@ -17,66 +17,110 @@
 #  limitations under the License.
 # ******************************************************************************
 
-from os import listdir
-from tempfile import mkdtemp
-
 from app import app
+import io
 import zipfile
 import os
 
 
-def search_python_file(directory):
+def find_task_programs(requiredPrograms):
+    """Get the programs of all tasks within the given ZIP file containing one folder per task by their task ID"""
+    taskIdProgramMap = {}
+
+    # limit the data that is read from the ZIP file and the nested ZIP files
+    readLimits = {'remainingBytes': app.config['MAX_EXTRACTED_BYTES'],
+                  'maxDepth': app.config['MAX_ARCHIVE_DEPTH']}
+    with zipfile.ZipFile(requiredPrograms, "r") as zip_ref:
+
+        # zip contains one folder per task within the candidate
+        taskIds = []
+        for name in zip_ref.namelist():
+            pathElements = name.split('/')
+            if len(pathElements) > 1 and pathElements[0] not in taskIds:
+                taskIds.append(pathElements[0])
+
+        for taskId in taskIds:
+            app.logger.info('Searching for program related to task with ID: ' + str(taskId))
+
+            # search for Python file and store with ID if found
+            program = search_python_file(zip_ref, taskId + '/', 0, readLimits)
+            if program is not None:
+                taskIdProgramMap[taskId] = program
+    return taskIdProgramMap
+
+
+def search_python_file(zip_ref, directory, depth, readLimits):
+    """Search for the program within the given directory of the given ZIP file by only reading the required files"""
+    entries = [entry for entry in zip_ref.infolist() if entry.filename.startswith(directory)
+               and entry.filename[len(directory):] and '/' not in entry.filename[len(directory):]]
+
     # only .py are supported, also nested in zip files
-    containedPythonFiles = [f for f in listdir(os.path.join(directory)) if f.endswith('app.py')]
+    containedPythonFiles = [entry for entry in entries if entry.filename.endswith('app.py')]
     if len(containedPythonFiles) >= 1:
-        app.logger.info('Found Python file with name: ' + str(containedPythonFiles[0]))
+        fileName = os.path.basename(containedPythonFiles[0].filename)
+        app.logger.info('Found Python file with name: ' + str(fileName))
 
         # we only support one file, in case there are multiple files, try the first one
-        return os.path.join(directory, containedPythonFiles[0])
+        return {'fileName': fileName,
+                'sourceCode': read_entry(zip_ref, containedPythonFiles[0], readLimits).decode('utf-8')}
 
     # check if there are nested Python files
-    containedZipFiles = [f for f in listdir(os.path.join(directory)) if f.endswith('.zip')]
+    containedZipFiles = [entry for entry in entries if entry.filename.endswith('.zip')]
+    if containedZipFiles and depth >= readLimits['maxDepth']:
+        raise Exception('Nesting depth of ZIP files exceeds the maximum depth of ' + str(readLimits['maxDepth']))
     for zip in containedZipFiles:
 
-        # extract the zip file
-        with zipfile.ZipFile(os.path.join(directory, zip), "r") as zip_ref:
-            folder = mkdtemp()
-            app.logger.info('Extracting to directory: ' + str(folder))
-            zip_ref.extractall(folder)
+        # open the nested zip file in memory
+        app.logger.info('Searching in nested ZIP file: ' + str(zip.filename))
+        with zipfile.ZipFile(io.BytesIO(read_entry(zip_ref, zip, readLimits)), "r") as nested_zip_ref:
 
             # recursively search within zip
-            result = search_python_file(folder)
+            result = search_python_file(nested_zip_ref, '', depth + 1, readLimits)
 
             # return if we found the first Python file
             if result is not None:
-                return os.path.join(folder, result)
+                return result
 
     return None
 
 
-def zip_runtime_program(hybridProgramTemp, metaDataTemp):
-    if os.path.exists('../hybrid_program.zip'):
-        os.remove('../hybrid_program.zip')
-    zipObj = zipfile.ZipFile('../hybrid_program.zip', 'w')
-    zipObj.write(hybridProgramTemp.name, 'hybrid_program.py')
-    zipObj.write(metaDataTemp.name, 'hybrid_program.json')
-    zipObj.close()
-    zipObj = open('../hybrid_program.zip', "rb")
-    return zipObj.read(), '../hybrid_program.zip'
+def read_entry(zip_ref, entry, readLimits):
+    """Read the given entry of the ZIP file if the total amount of read data stays within the limits"""
+    if entry.file_size > readLimits['remainingBytes']:
+        raise Exception('Size of the required programs exceeds the maximum of ' + str(app.config['MAX_EXTRACTED_BYTES'])
+                        + ' bytes')
+    data = zip_ref.read(entry)
+    readLimits['remainingBytes'] -= len(data)
+    return data
+
 
+def zip_runtime_program(hybridProgram, metaData):
+    """Create the ZIP file with the hybrid program and its meta data in memory"""
+    hybridProgramBuffer = io.BytesIO()
+    with zipfile.ZipFile(hybridProgramBuffer, 'w') as zipObj:
+        write_entry(zipObj, 'hybrid_program.py', hybridProgram)
+        write_entry(zipObj, 'hybrid_program.json', metaData)
+    return hybridProgramBuffer.getvalue()
 
-def zip_polling_agent(templatesDirectory, pollingAgentTemp, hybridProgram):
+
+def zip_polling_agent(templatesDirectory, pollingAgent, hybridProgramData):
     # zip generated polling agent, afterwards zip resulting file with required Dockerfile
-    if os.path.exists('../polling_agent.zip'):
-        os.remove('../polling_agent.zip')
-    if os.path.exists('../polling_agent_wrapper.zip'):
-        os.remove('../polling_agent_wrapper.zip')
-    zipObj = zipfile.ZipFile('../polling_agent.zip', 'w')
-    zipObj.write(pollingAgentTemp.name, 'polling_agent.py')
-    zipObj.write(hybridProgram, 'hybrid_program.zip')
-    zipObj.close()
-    zipObj = zipfile.ZipFile('../polling_agent_wrapper.zip', 'w')
-    zipObj.write('../polling_agent.zip', 'service.zip')
-    zipObj.write(os.path.join(templatesDirectory, 'Dockerfile'), 'Dockerfile')
-    zipObj = open('../polling_agent_wrapper.zip', "rb")
-    return zipObj.read()
+    pollingAgentBuffer = io.BytesIO()
+    with zipfile.ZipFile(pollingAgentBuffer, 'w') as zipObj:
+        write_entry(zipObj, 'polling_agent.py', pollingAgent)
+        write_entry(zipObj, 'hybrid_program.zip', hybridProgramData)
+    pollingAgentWrapperBuffer = io.BytesIO()
+    with zipfile.ZipFile(pollingAgentWrapperBuffer, 'w') as zipObj:
+        write_entry(zipObj, 'service.zip', pollingAgentBuffer.getvalue())
+        with open(os.path.join(templatesDirectory, 'Dockerfile'), 'rb') as dockerfile:
+            write_entry(zipObj, 'Dockerfile', dockerfile.read())
+    return pollingAgentWrapperBuffer.getvalue()
+
+
+def write_entry(zipObj, name, data):
+    """Write the given entry with a fixed time and permissions, so that identical artifacts result in identical ZIP
+    files, which are stored only once by the artifact store"""
+    zipInfo = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    zipInfo.external_attr = 0o644 << 16
+    zipInfo.compress_type = zipObj.compression
+    zipObj.writestr(zipInfo, data)
@@ -0,0 +1,199 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+import time
+from datetime import datetime
+
+from flask import g, request
+from rq.registry import FailedJobRegistry, StartedJobRegistry
+
+from app import app, result_cache
+from app.hybrid_program_generation import analysis_cache
+
+# Redis keys of the metrics, which are shared by the web tier and all workers
+metricsPrefix = 'qiskit-runtime-handler:metrics:'
+
+# histograms recorded by the web tier and the workers with their description and upper bounds of their buckets
+histograms = {
+    'qiskit_runtime_handler_request_duration_seconds': (
+        'Duration of HTTP requests by endpoint, method and status',
+        [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]),
+    'qiskit_runtime_handler_job_duration_seconds': (
+        'Duration of generation jobs by queue and outcome',
+        [0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600]),
+    'qiskit_runtime_handler_job_stage_duration_seconds': (
+        'Wall time of the stages of generation jobs',
+        [0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300]),
+    'qiskit_runtime_handler_artifact_size_bytes': (
+        'Size of generated artifacts by artifact type',
+        [1024 * 4 ** exponent for exponent in range(10)])}
+
+# counters recorded by the web tier and the workers with their description
+counters = {
+    'qiskit_runtime_handler_jobs_total': 'Finished generation jobs by queue and outcome'}
+
+
+def format_labels(labels):
+    return ','.join(name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+                    for name, value in sorted(labels.items()))
+
+
+def observe(name, value, pipeline=None, **labels):
+    """Add the given value to the histogram with the given name, optionally using the given Redis pipeline
+
+    Each value is counted only in its smallest bucket, the cumulative counts are computed when exporting."""
+    if not app.config['METRICS_ENABLED']:
+        return
+    labelString = format_labels(labels)
+    bucket = next((str(upperBound) for upperBound in histograms[name][1] if value <= upperBound), '+Inf')
+    executor = pipeline or app.redis.pipeline(transaction=False)
+    executor.hincrby(metricsPrefix + name, 'bucket:' + bucket + ':' + labelString, 1)
+    executor.hincrbyfloat(metricsPrefix + name, 'sum:' + labelString, value)
+    executor.hincrby(metricsPrefix + name, 'count:' + labelString, 1)
+    if pipeline is None:
+        executor.execute()
+
+
+def increment(name, pipeline=None, **labels):
+    """Increment the counter with the given name, optionally using the given Redis pipeline"""
+    if app.config['METRICS_ENABLED']:
+        (pipeline or app.redis).hincrby(metricsPrefix + name, format_labels(labels), 1)
+
+
+def record_job(queueName, duration, outcome, timings, programSize=None, agentSize=None):
+    """Record the duration, the outcome ('success', 'error', 'failed' or 'timeout'), the stage timings and the artifact
+    sizes of a generation job, failing to record them does not fail the job"""
+    if not app.config['METRICS_ENABLED']:
+        return
+    try:
+        pipeline = app.redis.pipeline(transaction=False)
+        observe('qiskit_runtime_handler_job_duration_seconds', duration, pipeline, queue=queueName, outcome=outcome)
+        increment('qiskit_runtime_handler_jobs_total', pipeline, queue=queueName, outcome=outcome)
+        for stage, timing in timings.stages.items():
+            observe('qiskit_runtime_handler_job_stage_duration_seconds', timing['wall'], pipeline, stage=stage)
+        if programSize is not None:
+            observe('qiskit_runtime_handler_artifact_size_bytes', programSize, pipeline, artifact='program')
+        if agentSize is not None:
+            observe('qiskit_runtime_handler_artifact_size_bytes', agentSize, pipeline, artifact='agent')
+        pipeline.execute()
+    except Exception as error:
+        app.logger.error('Recording metrics of job failed: ' + str(error))
+
+
+@app.before_request
+def start_request_timer():
+    g.requestStart = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    # requests do not fail if the metrics can not be recorded, e.g., if Redis is not available
+    if 'requestStart' in g:
+        try:
+            observe('qiskit_runtime_handler_request_duration_seconds', time.perf_counter() - g.requestStart,
+                    endpoint=request.endpoint or 'none', method=request.method, status=response.status_code)
+        except Exception as error:
+            app.logger.error('Recording metrics of request failed: ' + str(error))
+    return response
+
+
+def export_histogram(name, lines):
+    description, upperBounds = histograms[name]
+    lines.append('# HELP ' + name + ' ' + description)
+    lines.append('# TYPE ' + name + ' histogram')
+
+    # group the stored fields by label set
+    series = {}
+    for field, value in app.redis.hgetall(metricsPrefix + name).items():
+        kind, remainder = field.decode('utf-8').split(':', 1)
+        if kind == 'bucket':
+            bucket, labelString = remainder.split(':', 1)
+            series.setdefault(labelString, {}).setdefault('buckets', {})[bucket] = int(value)
+        else:
+            series.setdefault(remainder, {})[kind] = float(value)
+
+    for labelString, values in sorted(series.items()):
+        cumulativeCount = 0
+        for bucket in [str(upperBound) for upperBound in upperBounds] + ['+Inf']:
+            cumulativeCount += values.get('buckets', {}).get(bucket, 0)
+            bucketLabels = (labelString + ',' if labelString else '') + 'le="' + bucket + '"'
+            lines.append(name + '_bucket{' + bucketLabels + '} ' + str(cumulativeCount))
+        lines.append(name + '_sum{' + labelString + '} ' + repr(values.get('sum', 0.0)))
+        lines.append(name + '_count{' + labelString + '} ' + str(int(values.get('count', 0))))
+
+
+def export_samples(name, description, metricType, samples, lines):
+    lines.append('# HELP ' + name + ' ' + description)
+    lines.append('# TYPE ' + name + ' ' + metricType)
+    for labelString, value in samples:
+        lines.append(name + '{' + labelString + '} ' + str(value))
+
+
+def get_queue_samples():
+    """Get the number of waiting, running and failed jobs and the age of the oldest waiting job of each queue"""
+    samples = {'jobs': [], 'running': [], 'failed': [], 'age': []}
+    for queue in app.queues.values():
+        labelString = format_labels({'queue': queue.name})
+        samples['jobs'].append((labelString, queue.count))
+        samples['running'].append((labelString, StartedJobRegistry(queue=queue).count))
+        samples['failed'].append((labelString, FailedJobRegistry(queue=queue).count))
+
+        # the first job in the queue is the oldest one, it may have been removed by a worker in the meantime
+        oldestAge = 0.0
+        for jobId in queue.get_job_ids(0, 1):
+            job = queue.fetch_job(jobId)
+            if job is not None and job.enqueued_at is not None:
+                oldestAge = max(0.0, (datetime.utcnow() - job.enqueued_at).total_seconds())
+        samples['age'].append((labelString, oldestAge))
+    return samples
+
+
+def export_metrics():
+    """Get the metrics of the web tier and the workers in the Prometheus text format"""
+    lines = []
+    for name in histograms:
+        export_histogram(name, lines)
+    for name, description in counters.items():
+        export_samples(name, description, 'counter',
+                       [(labelString.decode('utf-8'), int(value))
+                        for labelString, value in sorted(app.redis.hgetall(metricsPrefix + name).items())], lines)
+
+    # state of the queues at the time of the scrape
+    queueSamples = get_queue_samples()
+    export_samples('qiskit_runtime_handler_queue_jobs', 'Jobs waiting in the queue', 'gauge',
+                   queueSamples['jobs'], lines)
+    export_samples('qiskit_runtime_handler_queue_oldest_job_age_seconds', 'Age of the oldest job waiting in the queue',
+                   'gauge', queueSamples['age'], lines)
+    export_samples('qiskit_runtime_handler_queue_running_jobs', 'Jobs of the queue currently executed by workers',
+                   'gauge', queueSamples['running'], lines)
+    export_samples('qiskit_runtime_handler_queue_failed_jobs', 'Jobs of the queue that failed with an exception',
+                   'gauge', queueSamples['failed'], lines)
+
+    # statistics of the caches, which are counted in Redis anyway
+    cacheStatistics = {'result': result_cache.get_statistics(), 'analysis': analysis_cache.get_statistics()}
+    for kind in ['hits', 'misses']:
+        export_samples('qiskit_runtime_handler_cache_' + kind + '_total', 'Cache ' + kind + ' by cache', 'counter',
+                       [(format_labels({'cache': cache}), statistics[kind])
+                        for cache, statistics in cacheStatistics.items()], lines)
+    export_samples('qiskit_runtime_handler_cache_hit_ratio', 'Ratio of cache hits to all lookups by cache', 'gauge',
+                   [(format_labels({'cache': cache}),
+                     statistics['hits'] / max(1, statistics['hits'] + statistics['misses']))
+                    for cache, statistics in cacheStatistics.items()], lines)
+    return '\n'.join(lines) + '\n'
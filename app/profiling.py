@@ -0,0 +1,83 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import tracemalloc
+import zipfile
+
+from app import app
+
+
+def should_profile(requested):
+    """Check if a job is profiled, either on request or if it is sampled using the configured sampling rate"""
+    return requested or random.random() < app.config['PROFILE_SAMPLING_RATE']
+
+
+class JobProfiler(object):
+    """Deterministic profiler and tracker of the memory allocations of the Python code executed by a job"""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.tracingMemory = False
+
+    def start(self):
+        # memory that is already traced, e.g., by a debugging session, is not reset
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(app.config['PROFILE_TRACEBACK_LIMIT'])
+            self.tracingMemory = True
+        self.profiler.enable()
+
+    def close(self):
+        """Stop profiling without creating a profile, e.g., if the job failed, can be called repeatedly"""
+        self.profiler.disable()
+        if self.tracingMemory:
+            tracemalloc.stop()
+            self.tracingMemory = False
+
+    def stop(self):
+        """Stop profiling and get a ZIP file containing the profile in the format of pstats, as well as reports of the
+        functions with the highest cumulative time and of the lines allocating the most memory"""
+        self.profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        currentMemory, peakMemory = tracemalloc.get_traced_memory()
+        self.close()
+
+        stats = pstats.Stats(self.profiler)
+        profileReport = io.StringIO()
+        stats.stream = profileReport
+        stats.sort_stats('cumulative').print_stats(app.config['PROFILE_REPORT_ENTRIES'])
+
+        memoryReport = ['Peak traced memory: ' + str(peakMemory) + ' bytes',
+                        'Traced memory at the end of the job: ' + str(currentMemory) + ' bytes', '',
+                        'Allocations by line at the end of the job:']
+        memoryReport.extend(str(statistic)
+                            for statistic in snapshot.statistics('lineno')[:app.config['PROFILE_REPORT_ENTRIES']])
+
+        profileData = io.BytesIO()
+        with zipfile.ZipFile(profileData, 'w', zipfile.ZIP_DEFLATED) as zipFile:
+            # can be loaded using pstats.Stats('profile.prof') or visualized, e.g., using snakeviz
+            zipFile.writestr('profile.prof', marshal.dumps(stats.stats))
+            zipFile.writestr('profile.txt', profileReport.getvalue())
+            zipFile.writestr('memory.txt', '\n'.join(memoryReport) + '\n')
+        return profileData.getvalue()
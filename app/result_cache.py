@@ -0,0 +1,143 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import hashlib
+import json
+import time
+import zipfile
+
+from app import app
+from app.artifact_store import get_artifact_store
+from app.hybrid_program_generation.analysis_cache import analysisVersion
+from app.result_model import Result
+
+# Redis keys of the cache mapping generation inputs to the IDs of successfully completed results
+resultCachePrefix = 'qiskit-runtime-handler:result-cache:'
+resultCacheIndex = resultCachePrefix + 'index'
+resultCacheHits = resultCachePrefix + 'hits'
+resultCacheMisses = resultCachePrefix + 'misses'
+
+# version of the generated programs and agents, which has to be increased whenever the generation or the templates
+# change, so that results of previous deployments are not reused
+generationVersion = 1
+
+
+def get_cache_key(beforeLoop, afterLoop, loopCondition, provenanceCollection, engine, requiredProgramsPath):
+    """Get the canonical hash of the generation inputs, including the programs of all tasks in the given ZIP file"""
+    candidate = {'generationVersion': generationVersion,
+                 'analysisVersion': analysisVersion,
+                 'beforeLoop': beforeLoop,
+                 'afterLoop': afterLoop,
+                 'loopCondition': loopCondition,
+                 'provenanceCollection': provenanceCollection,
+                 'engine': engine or app.config['CODE_ENGINE'],
+                 'programs': get_program_hashes(requiredProgramsPath)}
+    return hashlib.sha256(json.dumps(candidate, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_program_hashes(requiredProgramsPath):
+    """Get the hashes of the files within the task folders of the given ZIP file that are read by the workers, i.e.,
+    the program of each task or, if there is none, the nested ZIP files, which are hashed without opening them"""
+    entriesByTask = {}
+    with zipfile.ZipFile(requiredProgramsPath, "r") as zip_ref:
+        for zipInfo in zip_ref.infolist():
+            pathElements = zipInfo.filename.split('/')
+            if len(pathElements) == 2 and pathElements[1]:
+                entriesByTask.setdefault(pathElements[0], []).append(zipInfo)
+
+        # select the entries like the workers, which use the first program or search the nested ZIP files otherwise
+        selectedEntries = []
+        for entries in entriesByTask.values():
+            programs = [entry for entry in entries if entry.filename.endswith('app.py')]
+            selectedEntries.extend(programs[:1] or [entry for entry in entries if entry.filename.endswith('.zip')])
+
+        # limit the data that is read from the ZIP file like the workers do
+        programHashes = {}
+        remainingBytes = app.config['MAX_EXTRACTED_BYTES']
+        for zipInfo in selectedEntries:
+            # hash the entry in chunks to not decompress it into memory
+            contentHash = hashlib.sha256()
+            with zip_ref.open(zipInfo) as entry:
+                for chunk in iter(lambda: entry.read(65536), b''):
+                    remainingBytes -= len(chunk)
+                    if remainingBytes < 0:
+                        raise ValueError('Size of the required programs exceeds the maximum of '
+                                         + str(app.config['MAX_EXTRACTED_BYTES']) + ' bytes')
+                    contentHash.update(chunk)
+            programHashes[zipInfo.filename] = contentHash.hexdigest()
+    return programHashes
+
+
+def lookup_result(cacheKey):
+    """Get the ID of a successfully completed result for the given cache key if available"""
+    if app.config['RESULT_CACHE_SIZE'] <= 0:
+        return None
+
+    resultId = app.redis.get(resultCachePrefix + cacheKey)
+    if resultId is not None:
+        resultId = resultId.decode('utf-8')
+        # reused artifacts are marked as recently used, so that they are not removed by the retention sweeper
+        result = Result.query.get(resultId)
+        if result is not None and result.complete and not result.error \
+                and get_artifact_store().touch_artifact(result.program_hash) \
+                and get_artifact_store().touch_artifact(result.agent_hash):
+            app.logger.info('Found cached result with ID: ' + resultId)
+            app.redis.incr(resultCacheHits)
+            app.redis.zadd(resultCacheIndex, {cacheKey: time.time()})
+            return resultId
+
+        # result or its artifacts are not available anymore
+        remove_result(cacheKey)
+
+    app.redis.incr(resultCacheMisses)
+    return None
+
+
+def store_result(cacheKey, resultId):
+    """Store the ID of a successfully completed result for the given cache key and evict least recently used entries
+    if the cache exceeds its maximum size"""
+    cacheSize = app.config['RESULT_CACHE_SIZE']
+    if cacheSize <= 0 or not cacheKey:
+        return
+
+    app.logger.info('Caching result with ID: ' + resultId)
+    app.redis.set(resultCachePrefix + cacheKey, resultId, ex=app.config['RESULT_CACHE_TTL'])
+    app.redis.zadd(resultCacheIndex, {cacheKey: time.time()})
+
+    # evict expired entries and the least recently used entries exceeding the maximum size
+    app.redis.zremrangebyscore(resultCacheIndex, '-inf', time.time() - app.config['RESULT_CACHE_TTL'])
+    evictionCount = app.redis.zcard(resultCacheIndex) - cacheSize
+    if evictionCount > 0:
+        for evictedKey in app.redis.zrange(resultCacheIndex, 0, evictionCount - 1):
+            app.logger.info('Evicting result from cache: ' + evictedKey.decode('utf-8'))
+            remove_result(evictedKey.decode('utf-8'))
+
+
+def remove_result(cacheKey):
+    """Remove the entry for the given cache key"""
+    app.redis.delete(resultCachePrefix + cacheKey)
+    app.redis.zrem(resultCacheIndex, cacheKey)
+
+
+def get_statistics():
+    """Get the number of cache hits, cache misses and cached results"""
+    return {'hits': int(app.redis.get(resultCacheHits) or 0),
+            'misses': int(app.redis.get(resultCacheMisses) or 0),
+            'size': app.redis.zcard(resultCacheIndex),
+            'maxSize': app.config['RESULT_CACHE_SIZE']}
@@ -17,16 +17,28 @@
 #  limitations under the License.
 # ******************************************************************************
 
-from sqlalchemy import LargeBinary
 from app import db
 
 
 class Result(db.Model):
     id = db.Column(db.String(36), primary_key=True)
-    program = db.Column('program', LargeBinary)
-    agent = db.Column('agent', LargeBinary)
+    program_hash = db.Column('program_hash', db.String(64))
+    program_size = db.Column('program_size', db.Integer)
+    agent_hash = db.Column('agent_hash', db.String(64))
+    agent_size = db.Column('agent_size', db.Integer)
     error = db.Column(db.String(1200), default="")
     complete = db.Column(db.Boolean, default=False)
+    timings = db.Column(db.JSON)
+    profile_hash = db.Column('profile_hash', db.String(64))
 
     def __repr__(self):
         return 'Result {}'.format(self.complete)
+
+
+class BatchEntry(db.Model):
+    batch_id = db.Column(db.String(36), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    result_id = db.Column(db.String(36))
+
+    def __repr__(self):
+        return 'BatchEntry {} {}'.format(self.batch_id, self.position)
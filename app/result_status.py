@@ -0,0 +1,76 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+from flask import url_for
+
+from app import app
+from app.result_model import Result
+
+# Redis keys marking results of jobs that are still running, so that their status does not require a DB query
+statusPrefix = 'qiskit-runtime-handler:status:'
+
+
+def mark_running(resultId, pipeline=None):
+    """Mark the result with the given ID as not complete yet, optionally using the given Redis pipeline"""
+    if app.config['STATUS_CACHE_TTL'] > 0:
+        (pipeline or app.redis).set(statusPrefix + resultId, 'running', ex=app.config['STATUS_CACHE_TTL'])
+
+
+def mark_complete(resultId):
+    """Remove the mark of the result with the given ID after its completion was committed to the DB"""
+    app.redis.delete(statusPrefix + resultId)
+
+
+def get_statuses(resultIds):
+    """Get the status of the results with the given IDs by their ID, unknown IDs are omitted"""
+    statuses = {}
+
+    # results of running jobs are answered from Redis with one round trip
+    if app.config['STATUS_CACHE_TTL'] > 0 and resultIds:
+        for resultId, mark in zip(resultIds, app.redis.mget([statusPrefix + resultId for resultId in resultIds])):
+            if mark is not None:
+                statuses[resultId] = {'id': resultId, 'complete': False}
+
+    # remaining results are retrieved in one query using the primary key index
+    remainingIds = [resultId for resultId in resultIds if resultId not in statuses]
+    if remainingIds:
+        for result in Result.query.filter(Result.id.in_(remainingIds)).all():
+            statuses[result.id] = get_status(result)
+    return statuses
+
+
+def get_status(result):
+    """Get the status of the given result including the URLs of the artifacts and the timings if it is complete"""
+    if not result.complete:
+        return {'id': result.id, 'complete': result.complete}
+    if result.error:
+        status = {'id': result.id, 'complete': result.complete, 'error': result.error}
+    else:
+        status = {'id': result.id, 'complete': result.complete,
+                  'programUrl': url_for('download_generated_file', name=result.id + '-program.zip'),
+                  'agentUrl': url_for('download_generated_file', name=result.id + '-agent.zip')}
+
+    # wall and CPU times of the stages of the generation, not available for results of older releases
+    if result.timings:
+        status['timings'] = result.timings
+
+    # profile of the generation if it was profiled
+    if result.profile_hash:
+        status['profileUrl'] = url_for('download_profile', result_id=result.id)
+    return status
@@ -0,0 +1,118 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import os
+import threading
+import time
+
+from app import app
+
+# Redis keys of the lock ensuring that only one process sweeps the folders at a time, and of the sweeping statistics
+retentionPrefix = 'qiskit-runtime-handler:retention:'
+retentionLock = retentionPrefix + 'lock'
+retentionFilesRemoved = retentionPrefix + 'files-removed'
+retentionBytesReclaimed = retentionPrefix + 'bytes-reclaimed'
+retentionLastSweep = retentionPrefix + 'last-sweep'
+
+sweeperThread = None
+
+
+def start_sweeper():
+    """Start the background thread periodically sweeping the upload and result folders of this process"""
+    global sweeperThread
+    if app.config['RETENTION_INTERVAL'] <= 0 or sweeperThread is not None:
+        return
+    sweeperThread = threading.Thread(target=run_sweeper, name='retention-sweeper', daemon=True)
+    sweeperThread.start()
+
+
+def run_sweeper():
+    """Sweep the folders once per interval"""
+    while True:
+        try:
+            # all web processes run a sweeper, but only one sweeps per interval
+            if app.redis.set(retentionLock, os.getpid(), nx=True, ex=app.config['RETENTION_INTERVAL']):
+                sweep()
+        except Exception as error:
+            app.logger.error('Sweeping of files failed: ' + str(error))
+        time.sleep(app.config['RETENTION_INTERVAL'])
+
+
+def sweep():
+    """Remove expired files and the least recently used files exceeding the maximum folder sizes, and get the number
+    of removed files and reclaimed bytes"""
+    filesRemoved, bytesReclaimed = 0, 0
+    for directory, retention, maxSize in [
+            (app.config['UPLOAD_FOLDER'], app.config['UPLOAD_RETENTION'], app.config['UPLOAD_FOLDER_MAX_SIZE']),
+            (app.config['RESULT_FOLDER'], app.config['RESULT_RETENTION'], app.config['RESULT_FOLDER_MAX_SIZE'])]:
+        folderFilesRemoved, folderBytesReclaimed = sweep_folder(directory, retention, maxSize)
+        filesRemoved += folderFilesRemoved
+        bytesReclaimed += folderBytesReclaimed
+
+    app.logger.info('Removed ' + str(filesRemoved) + ' files reclaiming ' + str(bytesReclaimed) + ' bytes')
+    app.redis.incrby(retentionFilesRemoved, filesRemoved)
+    app.redis.incrby(retentionBytesReclaimed, bytesReclaimed)
+    app.redis.set(retentionLastSweep, time.time())
+    return filesRemoved, bytesReclaimed
+
+
+def sweep_folder(directory, retention, maxSize):
+    """Sweep the given folder using the given retention time in seconds and maximum size in bytes (0 disables)"""
+    now = time.time()
+    files = []
+    for root, directories, fileNames in os.walk(directory):
+        for fileName in fileNames:
+            path = os.path.join(root, fileName)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    # files are touched whenever they are reused or downloaded, so the oldest modification time is the least recently
+    # used file
+    files.sort()
+    filesRemoved, bytesReclaimed = 0, 0
+    totalSize = sum(size for modificationTime, size, path in files)
+    for modificationTime, size, path in files:
+        # temporary files are only left over by processes that failed while writing them
+        if path.endswith('.tmp'):
+            expired = modificationTime < now - app.config['TEMPORARY_FILE_RETENTION']
+        else:
+            expired = 0 < retention and modificationTime < now - retention
+        if not expired and (path.endswith('.tmp') or maxSize <= 0 or totalSize <= maxSize):
+            continue
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        app.logger.info('Removed file: ' + path)
+        filesRemoved += 1
+        bytesReclaimed += size
+        totalSize -= size
+    return filesRemoved, bytesReclaimed
+
+
+def get_statistics():
+    """Get the number of removed files and reclaimed bytes, and the time of the last sweep"""
+    lastSweep = app.redis.get(retentionLastSweep)
+    return {'filesRemoved': int(app.redis.get(retentionFilesRemoved) or 0),
+            'bytesReclaimed': int(app.redis.get(retentionBytesReclaimed) or 0),
+            'lastSweep': float(lastSweep) if lastSweep is not None else None}
@@ -17,13 +17,20 @@
 #  limitations under the License.
 # ******************************************************************************
 
-from app import app, db
-from app.result_model import Result
-from flask import jsonify, abort, request, send_from_directory, url_for
+from app import app, db, artifact_store, completion_events, metrics, profiling, result_cache, result_status, \
+    retention, scheduling, upload_handoff
+from app.result_model import Result, BatchEntry
+from app.hybrid_program_generation import analysis_cache
+from app.hybrid_program_generation.code_engines import codeEngines
+from flask import jsonify, abort, request, send_file, send_from_directory, url_for
+import json
 import logging
 import os
-import string
-import random
+import hashlib
+import tempfile
+import uuid
+import zipfile
+import zlib
 
 
 @app.route('/qiskit-runtime-handler/api/v1.0/generate-hybrid-program', methods=['POST'])
@@ -57,61 +64,296 @@ def generate_hybrid_program():
         provenanceCollection = False
     app.logger.info('Provenance collection intended for hybrid program: ' + str(provenanceCollection))
 
+    # retrieve the code engine to use for the analysis and rewriting of the programs, otherwise the default is used
+    engine = request.form.get('engine')
+    if engine and engine not in codeEngines:
+        print('Unknown code engine: ' + engine)
+        abort(400)
+
+    # retrieve the lane to schedule the job in, otherwise it is chosen based on the estimated cost of the job
+    priority = request.form.get('priority')
+    if priority and priority not in scheduling.laneQueues:
+        print('Unknown priority: ' + priority)
+        abort(400)
+
+    # profile the generation on request, e.g., to analyse a slow candidate
+    profile = (request.form.get('profile') or 'false').lower() == 'true'
+
     # store file with required programs in local file and forward path to the workers
-    directory = app.config["UPLOAD_FOLDER"]
-    app.logger.info('Storing file comprising required programs at folder: ' + str(directory))
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    randomString = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-    fileName = 'required-programs' + randomString + '.zip'
-    requiredPrograms.save(os.path.join(directory, fileName))
-    url = url_for('download_uploaded_file', name=os.path.basename(fileName))
-    app.logger.info('File available via URL: ' + str(url))
+    uploadPath = store_upload(requiredPrograms)
 
-    # execute job asynchronously
-    job = app.queue.enqueue('app.tasks.generate_hybrid_program', beforeLoop=beforeLoop, afterLoop=afterLoop,
-                            loopCondition=loopCondition, requiredProgramsUrl=url,
-                            provenanceCollection=provenanceCollection, job_timeout=18000)
-    app.logger.info('Added job for hybrid program generation to the queue...')
-    result = Result(id=job.get_id())
-    db.session.add(result)
-    db.session.commit()
+    # reuse the result of a previous generation with the same inputs if available
+    resultId, job = prepare_generation(beforeLoop, afterLoop, loopCondition, provenanceCollection, engine, uploadPath,
+                                       priority, profile)
+    if job is not None:
+        db.session.commit()
+        enqueue_generations([job])
 
     # return location of task object to retrieve final result
     logging.info('Returning HTTP response to client...')
-    content_location = '/qiskit-runtime-handler/api/v1.0/results/' + result.id
+    content_location = '/qiskit-runtime-handler/api/v1.0/results/' + resultId
     response = jsonify({'Location': content_location})
     response.status_code = 202
     response.headers['Location'] = content_location
     return response
 
 
+@app.route('/qiskit-runtime-handler/api/v1.0/generate-hybrid-programs', methods=['POST'])
+def generate_hybrid_programs():
+    """Put hybrid program generation jobs for multiple candidates in queue. Return location of the batch."""
+
+    # candidates are given as JSON list, each referencing the file with its required programs by the form field name
+    try:
+        candidates = json.loads(request.form.get('candidates') or '')
+    except ValueError:
+        candidates = None
+    if not isinstance(candidates, list) or not candidates or len(candidates) > app.config['MAX_BATCH_SIZE']:
+        print('candidates parameter has to be a list with at most ' + str(app.config['MAX_BATCH_SIZE']) + ' entries!')
+        abort(400)
+    for position, candidate in enumerate(candidates):
+        message = validate_candidate(candidate)
+        if message:
+            message = 'Candidate ' + str(position) + ': ' + message
+            print(message)
+            abort(400, message)
+    app.logger.info('Received request for hybrid program generation of ' + str(len(candidates)) + ' candidates...')
+
+    # store each file once, even if it is shared by multiple candidates
+    uploadPaths = {}
+    for candidate in candidates:
+        fieldName = candidate.get('requiredPrograms', 'requiredPrograms')
+        if fieldName not in uploadPaths:
+            uploadPaths[fieldName] = store_upload(request.files[fieldName])
+
+    # add all results and batch entries in one transaction
+    batchId = str(uuid.uuid4())
+    jobs = []
+    for position, candidate in enumerate(candidates):
+        provenanceCollection = str(candidate.get('provenanceCollection', False)).lower() == 'true'
+        profile = str(candidate.get('profile', False)).lower() == 'true'
+        resultId, job = prepare_generation(candidate['beforeLoop'], candidate['afterLoop'], candidate['loopCondition'],
+                                           provenanceCollection, candidate.get('engine'),
+                                           uploadPaths[candidate.get('requiredPrograms', 'requiredPrograms')],
+                                           candidate.get('priority'), profile)
+        db.session.add(BatchEntry(batch_id=batchId, position=position, result_id=resultId))
+        if job is not None:
+            jobs.append(job)
+    db.session.commit()
+    enqueue_generations(jobs)
+
+    content_location = '/qiskit-runtime-handler/api/v1.0/batches/' + batchId
+    response = jsonify({'Location': content_location, 'id': batchId})
+    response.status_code = 202
+    response.headers['Location'] = content_location
+    return response
+
+
+def validate_candidate(candidate):
+    """Get the reason why the given candidate of a batch is invalid, or None if it is valid"""
+    if not isinstance(candidate, dict):
+        return 'has to be an object'
+    if not candidate.get('beforeLoop') or not candidate.get('afterLoop') or not candidate.get('loopCondition'):
+        return 'not all required parameters available'
+
+    # parameters are used as strings, booleans may also be given as strings
+    for name in ['beforeLoop', 'afterLoop', 'loopCondition', 'requiredPrograms', 'engine', 'priority']:
+        if name in candidate and not isinstance(candidate[name], str):
+            return 'parameter ' + name + ' has to be a string'
+    for name in ['provenanceCollection', 'profile']:
+        if name in candidate and not isinstance(candidate[name], (bool, str)):
+            return 'parameter ' + name + ' has to be a boolean'
+
+    if not request.files.get(candidate.get('requiredPrograms', 'requiredPrograms')):
+        return 'file ' + candidate.get('requiredPrograms', 'requiredPrograms') + ' is missing'
+    if candidate.get('engine') and candidate['engine'] not in codeEngines:
+        return 'unknown code engine ' + candidate['engine']
+    if candidate.get('priority') and candidate['priority'] not in scheduling.laneQueues:
+        return 'unknown priority ' + candidate['priority']
+    return None
+
+
+def store_upload(requiredPrograms):
+    """Store the given uploaded file comprising required programs in the upload folder under the hash of its content
+    and get its path, so that identical files are only stored once"""
+    directory = app.config["UPLOAD_FOLDER"]
+    app.logger.info('Storing file comprising required programs at folder: ' + str(directory))
+    if not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    # copy the file in chunks while hashing it and checking its size
+    contentHash = hashlib.sha256()
+    size = 0
+    fileDescriptor, temporaryPath = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fileDescriptor, 'wb') as file:
+            for chunk in iter(lambda: requiredPrograms.stream.read(65536), b''):
+                size += len(chunk)
+                if size > app.config['MAX_UPLOAD_SIZE']:
+                    print('File comprising required programs exceeds maximum size of '
+                          + str(app.config['MAX_UPLOAD_SIZE']) + ' bytes!')
+                    abort(413)
+                contentHash.update(chunk)
+                file.write(chunk)
+
+        # only valid ZIP files are stored under the hash of their content
+        try:
+            with zipfile.ZipFile(temporaryPath, 'r'):
+                pass
+        except (zipfile.BadZipFile, zlib.error) as error:
+            print('File comprising required programs is not a valid ZIP file: ' + str(error))
+            abort(400)
+
+        uploadPath = os.path.join(directory, 'required-programs-' + contentHash.hexdigest() + '.zip')
+        if os.path.exists(uploadPath):
+            app.logger.info('File comprising required programs already stored: ' + uploadPath)
+            os.utime(uploadPath)
+        else:
+            os.replace(temporaryPath, uploadPath)
+    finally:
+        if os.path.exists(temporaryPath):
+            os.remove(temporaryPath)
+    return uploadPath
+
+
+def prepare_generation(beforeLoop, afterLoop, loopCondition, provenanceCollection, engine, uploadPath, priority=None,
+                       profile=False):
+    """Get the ID of the result for the given candidate and the job to enqueue, which is None if the result of a
+    previous generation with the same inputs is reused, the added result has to be committed by the caller"""
+    # the key is only computed if results are cached, reading the programs that are also read by the workers
+    cacheKey = None
+    if app.config['RESULT_CACHE_SIZE'] > 0:
+        try:
+            cacheKey = result_cache.get_cache_key(beforeLoop, afterLoop, loopCondition, provenanceCollection, engine,
+                                                  uploadPath)
+        except (zipfile.BadZipFile, zlib.error) as error:
+            print('File comprising required programs is not a valid ZIP file: ' + str(error))
+            abort(400)
+        except ValueError as error:
+            print(str(error))
+            abort(413, str(error))
+
+    # a requested profile requires to execute the generation again
+    if cacheKey is not None and not profile:
+        resultId = result_cache.lookup_result(cacheKey)
+        if resultId is not None:
+            return resultId, None
+
+    url = url_for('download_uploaded_file', name=os.path.basename(uploadPath))
+    app.logger.info('File available via URL: ' + str(url))
+
+    # create the result before the job is executed, so that the worker always finds it
+    result = Result(id=str(uuid.uuid4()))
+    db.session.add(result)
+    lane, timeout = scheduling.schedule_job(beforeLoop, afterLoop, uploadPath, priority)
+    return result.id, {'resultId': result.id, 'uploadPath': uploadPath, 'lane': lane, 'timeout': timeout,
+                       'kwargs': {'beforeLoop': beforeLoop, 'afterLoop': afterLoop, 'loopCondition': loopCondition,
+                                  'requiredProgramsUrl': url,
+                                  'provenanceCollection': provenanceCollection, 'engine': engine,
+                                  'cacheKey': cacheKey, 'profile': profiling.should_profile(profile)}}
+
+
+def enqueue_generations(jobs):
+    """Execute the given jobs asynchronously, enqueuing all of them with one Redis pipeline"""
+
+    # hand off each uploaded file once, even if it is used by multiple jobs
+    jobsByUpload = {}
+    for job in jobs:
+        jobsByUpload.setdefault(job['uploadPath'], []).append(job)
+    for uploadPath, uploadJobs in jobsByUpload.items():
+        reference = upload_handoff.hand_off_upload(uploadPath, len(uploadJobs))
+        for job in uploadJobs:
+            job['kwargs']['requiredProgramsReference'] = reference
+
+    with app.redis.pipeline() as pipeline:
+        for job in jobs:
+            result_status.mark_running(job['resultId'], pipeline)
+            queue = app.queues[job['lane']]
+            queue.enqueue_job(queue.create_job('app.tasks.generate_hybrid_program', kwargs=job['kwargs'],
+                                               job_id=job['resultId'], timeout=job['timeout']), pipeline=pipeline)
+        pipeline.execute()
+    app.logger.info('Added ' + str(len(jobs)) + ' jobs for hybrid program generation to the queue...')
+
+
+@app.route('/qiskit-runtime-handler/api/v1.0/batches/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    """Return the aggregate status of a batch and the status of all its results."""
+    entries = db.session.query(Result).join(BatchEntry, BatchEntry.result_id == Result.id) \
+        .filter(BatchEntry.batch_id == batch_id).order_by(BatchEntry.position).all()
+    if not entries:
+        abort(404)
+    statuses = [result_status.get_status(result) for result in entries]
+    return jsonify({'id': batch_id,
+                    'complete': all(status['complete'] for status in statuses),
+                    'total': len(statuses),
+                    'completed': len([status for status in statuses if status['complete']]),
+                    'failed': len([status for status in statuses if 'error' in status]),
+                    'results': statuses}), 200
+
+
 @app.route('/qiskit-runtime-handler/api/v1.0/results/<result_id>', methods=['GET'])
 def get_result(result_id):
     """Return result when it is available."""
-    result = Result.query.get(result_id)
-    if result.complete:
-        if result.error:
-            return jsonify({'id': result.id, 'complete': result.complete, 'error': result.error}), 200
-        else:
-            # create result directory if not existing
-            directory = app.config["RESULT_FOLDER"]
-            if not os.path.exists(directory):
-                os.makedirs(directory)
-
-            # create files and serve as URL
-            programName = os.path.join(directory, result.id + '-program.zip')
-            with open(programName, 'wb') as file:
-                file.write(result.program)
-            agentName = os.path.join(directory, result.id + '-agent.zip')
-            with open(agentName, 'wb') as file:
-                file.write(result.agent)
-
-            return jsonify({'id': result.id, 'complete': result.complete,
-                            'programUrl': url_for('download_generated_file', name=result.id + '-program.zip'),
-                            'agentUrl': url_for('download_generated_file', name=result.id + '-agent.zip')}), 200
-    else:
-        return jsonify({'id': result.id, 'complete': result.complete}), 200
+    statuses = result_status.get_statuses([result_id])
+    if result_id not in statuses:
+        abort(404)
+    return jsonify(statuses[result_id]), 200
+
+
+@app.route('/qiskit-runtime-handler/api/v1.0/results/<result_id>/wait', methods=['GET'])
+def wait_for_result(result_id):
+    """Return result when it is available or the given timeout in seconds passed."""
+    timeout = min(request.args.get('timeout', app.config['MAX_WAIT_TIMEOUT'], type=float),
+                  app.config['MAX_WAIT_TIMEOUT'])
+    status = completion_events.wait_for_completion(result_id, timeout,
+                                                   lambda: result_status.get_statuses([result_id]).get(result_id))
+    if status is None:
+        abort(404)
+    return jsonify(status), 200
+
+
+@app.route('/qiskit-runtime-handler/api/v1.0/results', methods=['POST'])
+def get_results():
+    """Return the status of all results with the IDs given in the request body."""
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('ids'), list) \
+            or len(body['ids']) > app.config['MAX_STATUS_IDS'] \
+            or not all(isinstance(resultId, str) for resultId in body['ids']):
+        print('Request body has to contain a list of result IDs with at most ' + str(app.config['MAX_STATUS_IDS'])
+              + ' entries!')
+        abort(400)
+    resultIds = list(dict.fromkeys(body['ids']))
+    statuses = result_status.get_statuses(resultIds)
+    return jsonify({'results': [statuses[resultId] for resultId in resultIds if resultId in statuses],
+                    'unknownIds': [resultId for resultId in resultIds if resultId not in statuses]}), 200
+
+
+@app.route('/qiskit-runtime-handler/api/v1.0/result-cache', methods=['GET'])
+def get_result_cache_statistics():
+    """Return the hit/miss counters and the size of the result cache."""
+    return jsonify(result_cache.get_statistics()), 200
+
+
+@app.route('/qiskit-runtime-handler/api/v1.0/analysis-cache', methods=['GET'])
+def get_analysis_cache_statistics():
+    """Return the hit/miss counters of the cache for analysed task programs."""
+    return jsonify(analysis_cache.get_statistics()), 200
+
+
+@app.route('/qiskit-runtime-handler/api/v1.0/retention', methods=['GET'])
+def get_retention_statistics():
+    """Return the number of files removed and bytes reclaimed by the retention sweeper."""
+    return jsonify(retention.get_statistics()), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get the metrics of the web tier and the workers in the Prometheus text format."""
+    return app.response_class(metrics.export_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.before_first_request
+def start_retention_sweeper():
+    retention.start_sweeper()
 
 
 @app.route('/qiskit-runtime-handler/api/v1.0/uploads/<name>')
@@ -121,7 +363,40 @@ def download_uploaded_file(name):
 
 @app.route('/qiskit-runtime-handler/api/v1.0/hybrid-programs/<name>')
 def download_generated_file(name):
-    return send_from_directory(app.config["RESULT_FOLDER"], name)
+    """Return an artifact of a result using its content hash as strong ETag for conditional and range requests."""
+    resultArtifact = artifact_store.parse_file_name(name)
+    if resultArtifact is None:
+        abort(404)
+    resultId, artifact = resultArtifact
+    hashes = db.session.query(Result.program_hash, Result.agent_hash).filter(Result.id == resultId).first()
+    contentHash = None
+    if hashes is not None:
+        contentHash = hashes.program_hash if artifact == 'program' else hashes.agent_hash
+    if not contentHash:
+        abort(404)
+
+    # stream the artifact from the store instead of loading it into memory, marking it as recently used
+    artifactStore = artifact_store.get_artifact_store()
+    artifactFile = artifactStore.get_artifact(contentHash)
+    if artifactFile is None or not artifactStore.touch_artifact(contentHash):
+        abort(404)
+    return send_file(artifactFile, mimetype='application/zip', download_name=name, etag=contentHash)
+
+
+@app.route('/qiskit-runtime-handler/api/v1.0/results/<result_id>/profile', methods=['GET'])
+def download_profile(result_id):
+    """Return the profile of a profiled generation, containing a pstats file and reports of its time and memory."""
+    result = db.session.query(Result.profile_hash).filter(Result.id == result_id).first()
+    if result is None or not result.profile_hash:
+        abort(404)
+
+    # mark the profile as recently used, so that it is not removed by the retention sweeper
+    artifactStore = artifact_store.get_artifact_store()
+    profileFile = artifactStore.get_artifact(result.profile_hash)
+    if profileFile is None or not artifactStore.touch_artifact(result.profile_hash):
+        abort(404)
+    return send_file(profileFile, mimetype='application/zip', download_name=result_id + '-profile.zip',
+                     etag=result.profile_hash)
 
 
 @app.route('/qiskit-runtime-handler/api/v1.0/version', methods=['GET'])
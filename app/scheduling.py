@@ -0,0 +1,56 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import os
+
+from app import app
+
+# lanes in priority order by their names, workers have to listen on the queues in this order
+laneQueues = {'interactive': 'qiskit-runtime-handler',
+              'bulk': 'qiskit-runtime-handler-bulk'}
+
+
+def estimate_job_cost(beforeLoop, afterLoop, uploadPath):
+    """Estimate the duration in seconds of the generation job for the given candidate from its number of tasks and
+    the size of the uploaded file comprising the required programs"""
+    # tasks are given like for the generator, 'null' if there are no tasks before or after the loop
+    taskNames = set()
+    for tasks in [beforeLoop, afterLoop]:
+        if tasks and tasks != 'null':
+            taskNames.update(task for task in tasks.split(',') if task)
+    taskCount = len(taskNames)
+    megabytes = os.path.getsize(uploadPath) / (1024 * 1024)
+    return app.config['JOB_COST_BASE'] + taskCount * app.config['JOB_COST_PER_TASK'] \
+        + megabytes * app.config['JOB_COST_PER_MEGABYTE']
+
+
+def schedule_job(beforeLoop, afterLoop, uploadPath, priority=None):
+    """Get the lane and timeout in seconds for the generation job of the given candidate, using the given priority
+    or the lane matching its estimated cost"""
+    cost = estimate_job_cost(beforeLoop, afterLoop, uploadPath)
+    lane = priority
+    if not lane:
+        lane = 'interactive' if cost <= app.config['INTERACTIVE_MAX_COST'] else 'bulk'
+
+    # timeouts are derived from the estimation but bounded by the maximum timeout of the lane
+    maxTimeout = app.config['INTERACTIVE_JOB_TIMEOUT'] if lane == 'interactive' else app.config['BULK_JOB_TIMEOUT']
+    timeout = int(min(max(cost * app.config['JOB_TIMEOUT_FACTOR'], app.config['MIN_JOB_TIMEOUT']), maxTimeout))
+    app.logger.info('Scheduling job with estimated cost of ' + str(round(cost, 1)) + ' s in lane ' + lane
+                    + ' with timeout of ' + str(timeout) + ' s')
+    return lane, timeout
@@ -0,0 +1,63 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+import time
+from contextlib import contextmanager
+
+
+class StageTimings(object):
+    """Wall and CPU times in seconds of the stages of a generation job, as well as of the stages handling the
+    individual tasks of the candidate"""
+
+    def __init__(self):
+        # timings of the job by stage name in the order in which the stages were started
+        self.stages = {}
+
+        # timings by task ID and stage name
+        self.tasks = {}
+
+    @contextmanager
+    def measure(self, stage, task=None):
+        """Measure the stage executed within the context, adding up the times if the stage is executed repeatedly"""
+        wallStart = time.perf_counter()
+        cpuStart = time.process_time()
+        stages = self.stages if task is None else self.tasks.setdefault(task, {})
+        stages.setdefault(stage, {'wall': 0.0, 'cpu': 0.0})
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - wallStart, time.process_time() - cpuStart, task)
+
+    def add(self, stage, wallTime, cpuTime, task=None):
+        """Add times measured elsewhere, e.g., in another process"""
+        stages = self.stages if task is None else self.tasks.setdefault(task, {})
+        timing = stages.setdefault(stage, {'wall': 0.0, 'cpu': 0.0})
+        timing['wall'] += wallTime
+        timing['cpu'] += cpuTime
+
+    def to_dict(self):
+        """Get the timings with microsecond precision to store them with the result"""
+        return {'stages': round_timings(self.stages),
+                'tasks': {task: round_timings(stages) for task, stages in self.tasks.items()}}
+
+
+def round_timings(stages):
+    return {stage: {'wall': round(timing['wall'], 6), 'cpu': round(timing['cpu'], 6)}
+            for stage, timing in stages.items()}
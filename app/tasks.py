@@ -17,65 +17,113 @@
 #  limitations under the License.
 # ******************************************************************************
 
-from os import listdir
-from tempfile import mkdtemp
+import time
 
 from app import db, app
 from app.hybrid_program_generation import hybrid_program_generator
 from rq import get_current_job
+from rq.timeouts import JobTimeoutException
 
-from app.hybrid_program_generation.zip_handler import search_python_file
 from app.result_model import Result
-import zipfile
-import os
-import urllib.request
+from app.result_cache import store_result
+from app.result_status import mark_complete
+from app.completion_events import publish_completion
+from app.artifact_store import get_artifact_store
+from app.upload_handoff import get_task_programs, release_upload
+from app.stage_timings import StageTimings
+from app.metrics import record_job
+from app.profiling import JobProfiler
 
 
-def generate_hybrid_program(beforeLoop, afterLoop, loopCondition, requiredProgramsUrl, provenanceCollection):
+def generate_hybrid_program(beforeLoop, afterLoop, loopCondition, requiredProgramsUrl, provenanceCollection,
+                            engine=None, cacheKey=None, requiredProgramsReference=None, profile=False):
     """Generate the hybrid program for the given candidate and save the result in db"""
     job = get_current_job()
+    jobStart = time.perf_counter()
 
-    # get URL to the ZIP file with the required programs
-    url = 'http://' + os.environ.get('FLASK_RUN_HOST') + ':' + os.environ.get('FLASK_RUN_PORT') + requiredProgramsUrl
+    # wall and CPU times of the stages of the job, which are stored with the result
+    timings = StageTimings()
 
-    # download the ZIP file
-    app.logger.info('Downloading required programs from: ' + str(url))
-    downloadPath, response = urllib.request.urlretrieve(url, "requiredPrograms.zip")
+    # publish the metrics of the job for the metrics endpoint of the web tier, also if the job failed or timed out
+    outcome, result = 'failed', None
+    try:
+        result = create_result(job, timings, beforeLoop, afterLoop, loopCondition, requiredProgramsUrl,
+                               provenanceCollection, engine, cacheKey, requiredProgramsReference, profile)
+        outcome = 'error' if result.error else 'success'
+    except JobTimeoutException:
+        outcome = 'timeout'
+        raise
+    finally:
+        record_job(job.origin, time.perf_counter() - jobStart, outcome, timings,
+                   result.program_size if result is not None else None,
+                   result.agent_size if result is not None else None)
 
-    # dict to store task IDs and the paths to the related programs
-    taskIdProgramMap = {}
 
-    # extract the zip file
-    with zipfile.ZipFile(downloadPath, "r") as zip_ref:
-        directory = mkdtemp()
-        app.logger.info('Extracting to directory: ' + str(directory))
-        zip_ref.extractall(directory)
+def create_result(job, timings, beforeLoop, afterLoop, loopCondition, requiredProgramsUrl, provenanceCollection,
+                  engine, cacheKey, requiredProgramsReference, profile):
+    """Generate the hybrid program and the agent, and store them with the completed result of the given job"""
 
-        # zip contains one folder per task within the candidate
-        zipContents = [f for f in listdir(directory)]
-        for zipContent in zipContents:
-            app.logger.info('Searching for program related to task with ID: ' + str(zipContent))
+    # profile the job up to storing its artifacts if requested, analyses in other processes are not included
+    profiler = None
+    if profile:
+        app.logger.info('Profiling job: ' + job.get_id())
+        profiler = JobProfiler()
+        profiler.start()
 
-            # search for Python file and store with ID if found
-            pythonFile = search_python_file(os.path.join(directory, zipContent))
-            if pythonFile is not None:
-                taskIdProgramMap[zipContent] = pythonFile
+    try:
+        # dict to store task IDs and the related programs, only the entries containing the programs are read
+        try:
+            with timings.measure('readPrograms'):
+                taskIdProgramMap = get_task_programs(requiredProgramsReference, requiredProgramsUrl, timings)
+        except Exception as error:
+            app.logger.error(error)
+            programCreationResult = {'error': 'Unable to read required programs!\n' + str(error)}
+        else:
+            # create the hybrid program and a corresponding invoking agent
+            with timings.measure('createHybridProgram'):
+                programCreationResult = hybrid_program_generator.create_hybrid_program(
+                    beforeLoop, afterLoop, loopCondition, taskIdProgramMap, provenanceCollection, job.get_id(), engine,
+                    timings)
 
-    # create the hybrid program and a corresponding invoking agent
-    programCreationResult = hybrid_program_generator.create_hybrid_program(beforeLoop, afterLoop, loopCondition,
-                                                                           taskIdProgramMap, provenanceCollection,
-                                                                           job.get_id())
+        # insert results into job object
+        with timings.measure('loadResult'):
+            result = Result.query.get(job.get_id())
+        if 'error' not in programCreationResult:
+            app.logger.info('Program generation successful!')
 
-    # insert results into job object
-    result = Result.query.get(job.get_id())
-    if 'error' not in programCreationResult:
-        app.logger.info('Program generation successful!')
-        result.program = programCreationResult['program']
-        result.agent = programCreationResult['agent']
-    else:
-        app.logger.info('Program generation failed!')
-        result.error = programCreationResult['error']
-
-    # update database
+            # store the artifacts outside of the database, identical artifacts are stored only once
+            with timings.measure('storeArtifacts'):
+                artifactStore = get_artifact_store()
+                result.program_hash = artifactStore.put_artifact(programCreationResult['program'])
+                result.program_size = len(programCreationResult['program'])
+                result.agent_hash = artifactStore.put_artifact(programCreationResult['agent'])
+                result.agent_size = len(programCreationResult['agent'])
+        else:
+            app.logger.info('Program generation failed!')
+            result.error = programCreationResult['error']
+
+        # store the profile next to the artifacts of the result
+        if profiler is not None:
+            with timings.measure('storeProfile'):
+                result.profile_hash = get_artifact_store().put_artifact(profiler.stop())
+    finally:
+        # profiling must not stay enabled for later jobs of the worker if the job failed, e.g., due to a timeout
+        if profiler is not None:
+            profiler.close()
+
+    # update database, the duration of the commit itself can only be logged as the timings are part of it
     result.complete = True
+    result.timings = timings.to_dict()
+    commitStart = time.perf_counter()
     db.session.commit()
+    app.logger.info('Committed result in ' + '{:.3f}'.format(time.perf_counter() - commitStart) + ' s')
+    mark_complete(result.id)
+    publish_completion(result.id)
+
+    # uploaded file is not required anymore
+    release_upload(requiredProgramsReference)
+
+    # make successful results available for later requests with the same inputs
+    if 'error' not in programCreationResult:
+        store_result(cacheKey, result.id)
+    return result
@@ -0,0 +1,106 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+import io
+import os
+import urllib.request
+from collections import OrderedDict
+
+from app import app
+from app.hybrid_program_generation.zip_handler import find_task_programs
+from app.stage_timings import StageTimings
+
+# modes to hand off uploaded files from the web tier to the workers
+handOffModes = ['http', 'volume', 'redis']
+
+# Redis keys of the uploaded files handed off to the workers
+uploadPrefix = 'qiskit-runtime-handler:uploads:'
+
+# programs of the uploaded files read by this worker by the names of the files in least recently used order
+taskProgramsCache = OrderedDict()
+
+
+def hand_off_upload(uploadPath, jobCount=1):
+    """Make the given uploaded file available to the given number of jobs and get the reference to pass with them"""
+    mode = app.config['UPLOAD_HANDOFF']
+    if mode not in handOffModes:
+        raise Exception('Unknown hand-off mode for uploaded files: ' + str(mode))
+
+    fileName = os.path.basename(uploadPath)
+    if mode == 'redis':
+        app.logger.info('Storing uploaded file in Redis: ' + fileName)
+        with open(uploadPath, 'rb') as file:
+            app.redis.set(uploadPrefix + fileName, file.read(), ex=app.config['UPLOAD_HANDOFF_TTL'])
+
+        # identical files are stored under the same name, so the jobs of all requests using it are counted
+        app.redis.incrby(uploadPrefix + fileName + ':jobs', jobCount)
+        app.redis.expire(uploadPrefix + fileName + ':jobs', app.config['UPLOAD_HANDOFF_TTL'])
+    return {'mode': mode, 'name': fileName}
+
+
+def open_upload(reference, url):
+    """Get the referenced uploaded file as path or file-like object, falling back to downloading it from the web tier
+    if it is not directly available to the worker"""
+    if reference is not None and reference['mode'] == 'volume':
+        path = os.path.join(app.config['UPLOAD_FOLDER'], reference['name'])
+        if os.path.isfile(path):
+            app.logger.info('Reading uploaded file from shared volume: ' + path)
+            return path
+        app.logger.info('Uploaded file not available on shared volume: ' + path)
+
+    if reference is not None and reference['mode'] == 'redis':
+        data = app.redis.get(uploadPrefix + reference['name'])
+        if data is not None:
+            app.logger.info('Reading uploaded file from Redis: ' + reference['name'])
+            return io.BytesIO(data)
+        app.logger.info('Uploaded file not available in Redis: ' + reference['name'])
+
+    # get URL to the uploaded file and download it into memory
+    url = 'http://' + os.environ.get('FLASK_RUN_HOST') + ':' + os.environ.get('FLASK_RUN_PORT') + url
+    app.logger.info('Downloading uploaded file from: ' + str(url))
+    with urllib.request.urlopen(url) as response:
+        return io.BytesIO(response.read())
+
+
+def get_task_programs(reference, url, timings=None):
+    """Get the programs of all tasks within the referenced uploaded file, reusing the programs of files already read
+    by this worker, which are identified by their name containing the hash of their content"""
+    if reference is not None and reference['name'] in taskProgramsCache:
+        app.logger.info('Reusing programs of uploaded file: ' + reference['name'])
+        taskProgramsCache.move_to_end(reference['name'])
+        return dict(taskProgramsCache[reference['name']])
+
+    if timings is None:
+        timings = StageTimings()
+    with timings.measure('openUpload'):
+        requiredPrograms = open_upload(reference, url)
+    with timings.measure('findTaskPrograms'):
+        taskIdProgramMap = find_task_programs(requiredPrograms)
+    if reference is not None and app.config['TASK_PROGRAMS_CACHE_SIZE'] > 0:
+        taskProgramsCache[reference['name']] = taskIdProgramMap
+        while len(taskProgramsCache) > app.config['TASK_PROGRAMS_CACHE_SIZE']:
+            taskProgramsCache.popitem(last=False)
+    return dict(taskIdProgramMap)
+
+
+def release_upload(reference):
+    """Remove the referenced uploaded file from Redis once it is not required by any job anymore"""
+    if reference is not None and reference['mode'] == 'redis':
+        if app.redis.decr(uploadPrefix + reference['name'] + ':jobs') <= 0:
+            app.redis.delete(uploadPrefix + reference['name'], uploadPrefix + reference['name'] + ':jobs')
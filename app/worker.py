@@ -0,0 +1,189 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+"""Warm worker processes executing the generation jobs without forking a work horse for every job
+
+Start a pool of worker processes listening on the interactive and the bulk queue:
+
+    python -m app.worker --processes 4 qiskit-runtime-handler qiskit-runtime-handler-bulk
+"""
+import argparse
+import os
+import resource
+import signal
+import time
+
+from rq import Queue, SimpleWorker
+
+from app import app, db, scheduling
+from app.hybrid_program_generation.code_engines import analyse_program, codeEngines
+from app.hybrid_program_generation.template_registry import get_template
+from app.hybrid_program_generation.zip_handler import zip_runtime_program
+
+# program analysed by all code engines to warm up the generation stack before the first job
+warmUpProgram = '''import math
+from math import sqrt
+
+
+def square(value):
+    result = value * value
+    return result
+
+
+def execute(value):
+    result = math.floor(sqrt(square(value)))
+    return result
+
+
+if __name__ == '__main__':
+    result = execute(2)
+'''
+
+
+# processes inheriting a preloaded generation stack from the pool do not have to warm it up again
+preloaded = []
+
+
+def preload():
+    """Load and warm up the generation stack, i.e., parse the templates and run the code engines once, so that the
+    jobs do not pay for the imports and initializations"""
+    if preloaded:
+        return
+    start = time.perf_counter()
+    from app import tasks  # noqa: F401
+
+    get_template('qiskit_runtime_program.py')
+    get_template('polling_agent_template.py')
+    for engineName in codeEngines:
+        analyse_program(warmUpProgram, 'warm_up.py', 'warm_up', engineName)
+    zip_runtime_program(warmUpProgram, '{}')
+    preloaded.append(os.getpid())
+    app.logger.info('Preloaded generation stack in ' + '{:.2f}'.format(time.perf_counter() - start) + ' s')
+
+
+def get_memory_usage():
+    """Get the resident memory of the current process in bytes"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # peak instead of current memory on platforms without procfs, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class WarmWorker(SimpleWorker):
+    """Worker executing the jobs in its own long-lived process with the preloaded generation stack
+
+    The worker stops after the current job if its memory grew by more than WORKER_MAX_MEMORY_GROWTH since it was
+    started, so that it can be replaced by a new process, e.g., by the pool or by 'rq worker -w app.worker.WarmWorker'
+    with a restart policy."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        preload()
+        self.initialMemory = get_memory_usage()
+
+    def execute_job(self, job, queue):
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            # the session of a job must not be reused by the following jobs
+            db.session.remove()
+
+            memoryGrowth = get_memory_usage() - self.initialMemory
+            if memoryGrowth > app.config['WORKER_MAX_MEMORY_GROWTH']:
+                self.log.info('Worker %s: memory grew by %d MiB, stopping for recycling', self.key,
+                              memoryGrowth // (1024 * 1024))
+                self._stop_requested = True
+
+
+def run_worker(queueNames, burst):
+    """Run a warm worker in the current process until it stops"""
+    # connections inherited from the pool must not be shared with the other processes
+    db.engine.dispose()
+
+    queues = [Queue(queueName, connection=app.redis) for queueName in queueNames]
+    WarmWorker(queues, connection=app.redis).work(burst=burst)
+
+
+def run_pool(queueNames, processes, burst=False):
+    """Run the given number of warm worker processes forked from this process after preloading the generation stack,
+    and replace stopped workers until the pool is stopped or, in burst mode, until the queues are empty"""
+    preload()
+    workerProcesses = {}
+    stopping = []
+
+    def start_worker():
+        pid = os.fork()
+        if pid == 0:
+            exitCode = 1
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                run_worker(queueNames, burst)
+                exitCode = 0
+            except Exception as error:
+                app.logger.error(error)
+            finally:
+                os._exit(exitCode)
+        workerProcesses[pid] = time.monotonic()
+
+    def stop_pool(signum, frame):
+        stopping.append(signum)
+        # a terminal already sends interrupts to all processes of the pool
+        if signum == signal.SIGTERM:
+            for pid in list(workerProcesses):
+                os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop_pool)
+    signal.signal(signal.SIGINT, stop_pool)
+
+    for process in range(processes):
+        start_worker()
+    while workerProcesses:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        startTime = workerProcesses.pop(pid, None)
+
+        if stopping:
+            continue
+        if burst and not any(Queue(queueName, connection=app.redis).count for queueName in queueNames):
+            continue
+        app.logger.info('Replacing stopped worker process ' + str(pid))
+
+        # avoid restarting failing workers in a tight loop, e.g., while Redis is not available
+        if startTime is not None and time.monotonic() - startTime < 1:
+            time.sleep(1)
+        start_worker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('queues', nargs='*', default=list(scheduling.laneQueues.values()))
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--burst', action='store_true', help='stop when the queues are empty')
+    arguments = parser.parse_args()
+    run_pool(arguments.queues, arguments.processes, arguments.burst)
+
+
+if __name__ == '__main__':
+    main()
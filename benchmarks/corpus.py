@@ -0,0 +1,102 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+"""Generator of synthetic workflow fragments, i.e., archives with one program per task in the format of the
+requiredPrograms uploaded to the Qiskit Runtime handler"""
+import io
+import zipfile
+
+
+def generate_program(helperMethods=4, callDepth=2, executeSites=2, lines=1000, seed=0):
+    """Get the source code of a task program with an execute method calling the given number of helper methods in
+    chains of the given depth, which contain the given number of qiskit.execute calls, padded with methods that are
+    not called by the execute method to approximately the given number of lines"""
+    callDepth = max(1, min(callDepth, max(1, helperMethods)))
+    chainCount = -(-helperMethods // callDepth) if helperMethods > 0 else 0
+    helperNames = [['helper_' + str(chain) + '_' + str(level) for level in range(callDepth)
+                    if chain * callDepth + level < helperMethods] for chain in range(chainCount)]
+
+    # distribute the qiskit.execute calls evenly among the helper methods, or the execute method without helpers
+    flatNames = [name for chain in helperNames for name in chain]
+    sites = {}
+    for site in range(executeSites):
+        owner = flatNames[site % len(flatNames)] if flatNames else 'execute'
+        sites[owner] = sites.get(owner, 0) + 1
+
+    code = ['import qiskit', 'import numpy as np', 'from qiskit import QuantumCircuit', '', '']
+    for chain in helperNames:
+        for level, name in enumerate(chain):
+            code.append('def ' + name + '(circuit, backend, shots, value):')
+            code.append('    angle = value * ' + str(level + 2) + ' + ' + str(seed))
+            code.append('    circuit.rx(angle, 0)')
+            code.extend(generate_execute_sites(sites.get(name, 0)))
+            if level + 1 < len(chain):
+                code.append('    result = ' + chain[level + 1] + '(circuit, backend, shots, angle)')
+            else:
+                code.append('    result = np.sqrt(abs(angle))')
+            code.append('    return result')
+            code.extend(['', ''])
+
+    code.append('def execute(theta, shots, backend):')
+    code.append('    circuit = QuantumCircuit(2)')
+    code.append('    value = theta')
+    code.extend(generate_execute_sites(sites.get('execute', 0)))
+    for chain in helperNames:
+        code.append('    value = ' + chain[0] + '(circuit, backend, shots, value)')
+    code.append('    return value')
+    code.extend(['', ''])
+
+    # methods that are parsed but not merged into the hybrid program, as in larger real-world programs
+    filler = 0
+    while len(code) + 4 < lines:
+        code.append('def unused_' + str(filler) + '(values):')
+        code.append('    total = 0')
+        code.append('    for index, value in enumerate(values):')
+        code.append('        if index % ' + str(filler % 7 + 2) + ' == 0:')
+        code.append('            total += value * ' + str(filler))
+        code.append('        else:')
+        code.append('            total -= value')
+        code.append('    return total')
+        code.extend(['', ''])
+        filler += 1
+
+    code.append('if __name__ == \'__main__\':')
+    code.append('    value = execute(0.1, 1024, None)')
+    return '\n'.join(code) + '\n'
+
+
+def generate_execute_sites(count):
+    code = []
+    for site in range(count):
+        code.append('    job = qiskit.execute(circuit, backend, shots=shots)')
+        code.append('    counts_' + str(site) + ' = job.result().get_counts()')
+    return code
+
+
+def generate_required_programs(tasks=2, helperMethods=4, callDepth=2, executeSites=2, lines=1000, seed=0):
+    """Get the task names and the ZIP file containing a folder with a generated program for each task, programs
+    generated with different seeds differ in their content"""
+    taskNames = ['Task_' + str(task) for task in range(tasks)]
+    requiredPrograms = io.BytesIO()
+    with zipfile.ZipFile(requiredPrograms, 'w', zipfile.ZIP_DEFLATED) as zipFile:
+        for task, taskName in enumerate(taskNames):
+            zipFile.writestr(taskName + '/app.py', generate_program(helperMethods, callDepth, executeSites, lines,
+                                                                   seed * tasks + task))
+    return taskNames, requiredPrograms.getvalue()
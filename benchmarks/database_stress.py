@@ -0,0 +1,104 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+"""Stress test of the database with concurrent processes behaving like the web tier and the workers
+
+Each process repeatedly creates a result, polls its status and completes it, like a request and its job. Run it,
+e.g., with SQLITE_JOURNAL_MODE=DELETE and SQLITE_JOURNAL_MODE=WAL to compare the write throughput, or with a
+PostgreSQL DATABASE_URL:
+
+    python -m benchmarks.database_stress --processes 8 --operations 200
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+
+
+def run_process(operations, queue):
+    from sqlalchemy.exc import OperationalError
+    from app import app, db
+    from app.result_model import Result
+
+    completed, lockErrors, operationTime = 0, 0, 0.0
+    with app.app_context():
+        # connections of the parent process must not be shared with the forked process
+        db.engine.dispose()
+        for operation in range(operations):
+            start = time.perf_counter()
+            try:
+                result = Result(id=str(uuid.uuid4()))
+                db.session.add(result)
+                db.session.commit()
+                Result.query.filter(Result.id.in_([result.id])).all()
+                result.complete = True
+                result.program_hash = result.agent_hash = '0' * 64
+                db.session.commit()
+                completed += 1
+            except OperationalError as error:
+                db.session.rollback()
+                if 'locked' not in str(error):
+                    raise
+                lockErrors += 1
+            operationTime += time.perf_counter() - start
+    queue.put((completed, lockErrors, operationTime))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=200)
+    arguments = parser.parse_args()
+
+    # use a new SQLite database unless another database is configured
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'stress.db')
+    from flask_migrate import upgrade
+    from app import app
+    with app.app_context():
+        upgrade()
+
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_process, args=(arguments.operations, queue))
+                 for process in range(arguments.processes)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = [queue.get() for process in processes]
+    for process in processes:
+        process.join()
+    duration = time.perf_counter() - start
+
+    completed = sum(result[0] for result in results)
+    database = app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]
+    if database.startswith('sqlite'):
+        database += ', journal mode: ' + app.config['SQLITE_JOURNAL_MODE']
+    print('database: ' + database)
+    print('completed operations: ' + str(completed) + ' in ' + '{:.2f}'.format(duration) + ' s ('
+          + '{:.1f}'.format(completed / duration) + ' operations/s)')
+    print('database is locked errors: ' + str(sum(result[1] for result in results)))
+    print('mean time per operation: ' + '{:.1f}'.format(1000 * sum(result[2] for result in results)
+                                                         / max(1, arguments.processes * arguments.operations))
+          + ' ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+"""Benchmarks of the generation of hybrid programs for synthetic workflow fragments
+
+Runs each benchmark for each scenario, i.e., each combination of the given corpus parameters, and saves the results
+as JSON to compare them with the results of other commits:
+
+    python -m benchmarks.generation --tasks 1 4 --lines 1000 20000 --output results.json
+    python -m benchmarks.generation --output new.json --compare results.json
+
+The full path through tasks.generate_hybrid_program additionally requires Redis at REDIS_URL and is skipped otherwise.
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+
+from benchmarks.corpus import generate_required_programs
+
+# queue used by the benchmark, so that running workers of the handler do not take its jobs
+benchmarkQueue = 'qiskit-runtime-handler-benchmark'
+
+
+def measure(function, repeats):
+    """Get the wall times in seconds of the given number of executions of the given function"""
+    durations = []
+    for repeat in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def check_generation(programCreationResult):
+    if 'error' in programCreationResult:
+        raise Exception('Generation failed: ' + programCreationResult['error'])
+
+
+def benchmark_zip_handler(scenario, requiredPrograms, taskNames, engine, repeats):
+    from app.hybrid_program_generation.zip_handler import find_task_programs
+    return measure(lambda: find_task_programs(io.BytesIO(requiredPrograms)), repeats)
+
+
+def benchmark_create_hybrid_program(scenario, requiredPrograms, taskNames, engine, repeats):
+    from app.hybrid_program_generation.hybrid_program_generator import create_hybrid_program
+    from app.hybrid_program_generation.zip_handler import find_task_programs
+    taskIdProgramMap = find_task_programs(io.BytesIO(requiredPrograms))
+    beforeLoop, afterLoop = split_tasks(taskNames)
+    return measure(lambda: check_generation(create_hybrid_program(beforeLoop, afterLoop, '${value < 1}',
+                                                                  taskIdProgramMap, False, 'benchmark', engine)),
+                   repeats)
+
+
+def benchmark_generate_polling_agent(scenario, requiredPrograms, taskNames, engine, repeats):
+    from app.hybrid_program_generation.polling_agent_handler import generate_polling_agent
+
+    # each task of the generated programs requires its inputs and provides its result
+    inputParameters = ['theta', 'shots'] + ['shots_' + task for task in taskNames]
+    outputParameters = ['value_' + task for task in taskNames]
+    return measure(lambda: generate_polling_agent(inputParameters, outputParameters, 'benchmark'), repeats)
+
+
+def benchmark_tasks(scenario, requiredPrograms, taskNames, engine, repeats):
+    from rq import Queue, SimpleWorker
+    from app import app, db
+    from app.result_model import Result
+    from app.upload_handoff import hand_off_upload
+
+    # the uploaded file is read from the upload folder like by workers sharing it with the web tier
+    uploadPath = os.path.join(app.config['UPLOAD_FOLDER'], 'required-programs-' + uuid.uuid4().hex + '.zip')
+    with open(uploadPath, 'wb') as file:
+        file.write(requiredPrograms)
+    reference = hand_off_upload(uploadPath, repeats)
+    beforeLoop, afterLoop = split_tasks(taskNames)
+    queue = Queue(benchmarkQueue, connection=app.redis)
+
+    def run_job():
+        resultId = str(uuid.uuid4())
+        with app.app_context():
+            db.session.add(Result(id=resultId))
+            db.session.commit()
+            queue.enqueue('app.tasks.generate_hybrid_program', job_id=resultId,
+                          kwargs={'beforeLoop': beforeLoop, 'afterLoop': afterLoop, 'loopCondition': '${value < 1}',
+                                  'requiredProgramsUrl': None, 'provenanceCollection': False, 'engine': engine,
+                                  'requiredProgramsReference': reference})
+            SimpleWorker([queue], connection=app.redis).work(burst=True)
+            result = Result.query.get(resultId)
+            if not result.complete or result.error:
+                raise Exception('Job failed: ' + str(result.error or queue.failed_job_registry.get_job_ids()))
+            db.session.remove()
+
+    return measure(run_job, repeats)
+
+
+# benchmarks by name
+benchmarks = {'zip_handler': benchmark_zip_handler,
+              'create_hybrid_program': benchmark_create_hybrid_program,
+              'generate_polling_agent': benchmark_generate_polling_agent,
+              'tasks': benchmark_tasks}
+
+
+def split_tasks(taskNames):
+    """Get the tasks before and after the loop of the candidate, the first half of the tasks is executed before"""
+    middle = max(1, (len(taskNames) + 1) // 2)
+    return ','.join(taskNames[:middle]), ','.join(taskNames[middle:]) or 'null'
+
+
+def redis_available():
+    from app import app
+    try:
+        return app.redis.ping()
+    except Exception:
+        return False
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_key(result):
+    return result['benchmark'] + ' ' + json.dumps(result['scenario'], sort_keys=True)
+
+
+def compare(results, baselinePath):
+    """Print the change of the median durations compared to the results of the given baseline"""
+    with open(baselinePath) as baselineFile:
+        baseline = {get_key(result): result for result in json.load(baselineFile)['results']}
+    for result in results:
+        previous = baseline.get(get_key(result))
+        if previous is None or 'median' not in previous or 'median' not in result:
+            continue
+        change = (result['median'] - previous['median']) / previous['median'] * 100
+        print('{:+.1f} % '.format(change) + get_key(result) + ' ({:.4f} s -> {:.4f} s)'.format(previous['median'],
+                                                                                              result['median']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--benchmarks', nargs='+', choices=list(benchmarks), default=list(benchmarks))
+    parser.add_argument('--tasks', type=int, nargs='+', default=[2])
+    parser.add_argument('--helpers', type=int, nargs='+', default=[4])
+    parser.add_argument('--depth', type=int, nargs='+', default=[2])
+    parser.add_argument('--execute-sites', type=int, nargs='+', default=[2])
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000])
+    parser.add_argument('--engines', nargs='+', default=['redbaron'])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help='JSON file with the results of a previous run')
+    arguments = parser.parse_args()
+
+    # analyses must not be reused between the repetitions, and a new database and new folders are used
+    directory = tempfile.mkdtemp()
+    os.environ['ANALYSIS_CACHE_TTL'] = '0'
+    os.environ['ANALYSIS_PROCESSES'] = os.environ.get('ANALYSIS_PROCESSES') or '1'
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'benchmark.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(directory, 'files')
+    os.environ['RESULT_FOLDER'] = os.path.join(directory, 'generated-files')
+    os.environ['UPLOAD_HANDOFF'] = 'volume'
+    os.environ['TASK_PROGRAMS_CACHE_SIZE'] = '0'
+    os.environ['METRICS_ENABLED'] = 'false'
+    from flask_migrate import upgrade
+    from app import app
+    with app.app_context():
+        upgrade()
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    selectedBenchmarks = list(arguments.benchmarks)
+    if 'tasks' in selectedBenchmarks and not redis_available():
+        print('Skipping benchmark of tasks.generate_hybrid_program as Redis is not available at '
+              + app.config['REDIS_URL'])
+        selectedBenchmarks.remove('tasks')
+
+    results = []
+    for tasks, helpers, depth, executeSites, lines in itertools.product(arguments.tasks, arguments.helpers,
+                                                                          arguments.depth, arguments.execute_sites,
+                                                                          arguments.lines):
+        taskNames, requiredPrograms = generate_required_programs(tasks, helpers, depth, executeSites, lines)
+        for benchmark in selectedBenchmarks:
+            # only the generation depends on the engine analysing the programs
+            engines = arguments.engines if benchmark in ['create_hybrid_program', 'tasks'] else [None]
+            for engine in engines:
+                scenario = {'tasks': tasks, 'helpers': helpers, 'depth': depth, 'executeSites': executeSites,
+                            'lines': lines, 'archiveBytes': len(requiredPrograms)}
+                if engine:
+                    scenario['engine'] = engine
+                result = {'benchmark': benchmark, 'scenario': scenario}
+                try:
+                    durations = benchmarks[benchmark](scenario, requiredPrograms, taskNames, engine,
+                                                      arguments.repeats)
+                    result.update({'durations': durations, 'min': min(durations),
+                                   'median': statistics.median(durations), 'mean': statistics.mean(durations)})
+                    print(get_key(result) + ': median {:.4f} s'.format(result['median']))
+                except Exception as error:
+                    result['error'] = str(error)
+                    print(get_key(result) + ': ' + str(error))
+                results.append(result)
+
+    with open(arguments.output, 'w') as outputFile:
+        json.dump({'commit': get_commit(), 'python': platform.python_version(), 'time': time.time(),
+                   'repeats': arguments.repeats, 'results': results}, outputFile, indent=2)
+    print('Saved results to ' + arguments.output)
+
+    if arguments.compare:
+        compare(results, arguments.compare)
+
+
+if __name__ == '__main__':
+    main()
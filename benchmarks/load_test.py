@@ -0,0 +1,304 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+"""Load test of the web tier and the workers with generated workflow fragments on a single machine
+
+Serves the Flask app on the loopback interface, submits candidates at the given rate, polls their results, and reports
+the throughput, the submit-to-complete latencies and the time spent in write statements of the database, which
+includes waiting for its write lock. The worker processes require Redis to be available at REDIS_URL:
+
+    python -m benchmarks.load_test --workers 4 --rate 0.5 --duration 60 --poll-mode wait
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from benchmarks.corpus import generate_required_programs
+
+# Redis key collecting the statistics of the database statements of the worker processes
+databaseSamplesKey = 'qiskit-runtime-handler:load-test:database'
+
+
+class DatabaseProbe(object):
+    """Durations of the write statements and number of lock errors of the database engine of this process"""
+
+    def __init__(self):
+        self.writeDurations = []
+        self.lockErrors = 0
+        self.lock = threading.Lock()
+
+    def install(self, engine):
+        from sqlalchemy import event
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+            connection.info.setdefault('loadTestStart', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+            duration = time.perf_counter() - connection.info['loadTestStart'].pop()
+            if statement.lstrip().split(' ', 1)[0].upper() in ['INSERT', 'UPDATE', 'DELETE']:
+                with self.lock:
+                    self.writeDurations.append(duration)
+
+        @event.listens_for(engine, 'handle_error')
+        def handle_error(context):
+            if context.connection is not None and context.connection.info.get('loadTestStart'):
+                context.connection.info['loadTestStart'].pop()
+            if 'locked' in str(context.original_exception):
+                with self.lock:
+                    self.lockErrors += 1
+
+    def publish(self, connection):
+        """Make the statistics of this process available to the load test"""
+        connection.rpush(databaseSamplesKey, json.dumps({'writeDurations': self.writeDurations,
+                                                         'lockErrors': self.lockErrors}))
+
+
+def run_worker_process(queueNames, probe):
+    """Run a warm worker until it is stopped and publish the statistics of its database statements"""
+    from app import app
+    from app.worker import run_worker
+    try:
+        run_worker(queueNames, False)
+    finally:
+        probe.publish(app.redis)
+
+
+def percentile(values, fraction):
+    """Get the given percentile of the given values using the nearest rank"""
+    if not values:
+        return None
+    orderedValues = sorted(values)
+    return orderedValues[min(len(orderedValues) - 1, max(0, int(round(fraction * len(orderedValues) + 0.5)) - 1))]
+
+
+def summarize(values):
+    return {'count': len(values), 'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95),
+            'p99': percentile(values, 0.99), 'max': max(values) if values else None}
+
+
+def format_summary(summary):
+    if not summary['count']:
+        return 'none'
+    return ', '.join(name + ' ' + '{:.3f}'.format(summary[name]) + ' s' for name in ['p50', 'p95', 'p99', 'max']) \
+        + ' (' + str(summary['count']) + ')'
+
+
+class LoadClient(object):
+    """Client submitting a candidate and polling its result like a workflow engine"""
+
+    def __init__(self, baseUrl, arguments):
+        self.baseUrl = baseUrl
+        self.arguments = arguments
+        self.lock = threading.Lock()
+        self.submitDurations = []
+        self.pollDurations = []
+        self.completionLatencies = []
+        self.completionTimes = []
+        self.errors = {}
+
+    def record(self, samples, value):
+        with self.lock:
+            samples.append(value)
+
+    def record_error(self, error):
+        with self.lock:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def run_candidate(self, taskNames, requiredPrograms):
+        try:
+            self.submit_and_poll(taskNames, requiredPrograms)
+        except Exception as error:
+            self.record_error(type(error).__name__)
+
+    def submit_and_poll(self, taskNames, requiredPrograms):
+        import requests
+        session = requests.Session()
+        middle = max(1, (len(taskNames) + 1) // 2)
+        data = {'beforeLoop': ','.join(taskNames[:middle]), 'afterLoop': ','.join(taskNames[middle:]) or 'null',
+                'loopCondition': '${value < 1}'}
+
+        submitted = time.perf_counter()
+        response = session.post(self.baseUrl + '/qiskit-runtime-handler/api/v1.0/generate-hybrid-program', data=data,
+                                files={'requiredPrograms': ('required-programs.zip', requiredPrograms)})
+        self.record(self.submitDurations, time.perf_counter() - submitted)
+        if response.status_code != 202:
+            self.record_error('submit: HTTP ' + str(response.status_code))
+            return
+        location = urljoin(self.baseUrl, response.headers['Location'])
+
+        # poll until the result is complete, either repeatedly or by waiting for the completion
+        deadline = submitted + self.arguments.result_timeout
+        while time.perf_counter() < deadline:
+            pollStart = time.perf_counter()
+            if self.arguments.poll_mode == 'wait':
+                response = session.get(location + '/wait', params={'timeout': self.arguments.wait_timeout})
+            else:
+                response = session.get(location)
+            self.record(self.pollDurations, time.perf_counter() - pollStart)
+            if response.status_code != 200:
+                self.record_error('poll: HTTP ' + str(response.status_code))
+                return
+            status = response.json()
+            if status.get('complete'):
+                completed = time.perf_counter()
+                self.record(self.completionLatencies, completed - submitted)
+                self.record(self.completionTimes, completed)
+                if status.get('error'):
+                    self.record_error('generation failed')
+                return
+            if self.arguments.poll_mode == 'poll':
+                time.sleep(self.arguments.poll_interval)
+        self.record_error('result timeout')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--rate', type=float, default=0.5, help='submissions per second')
+    parser.add_argument('--duration', type=float, default=60, help='seconds in which candidates are submitted')
+    parser.add_argument('--clients', type=int, default=64, help='maximum number of concurrent clients')
+    parser.add_argument('--poll-mode', choices=['poll', 'wait'], default='poll')
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--wait-timeout', type=float, default=30)
+    parser.add_argument('--result-timeout', type=float, default=1800)
+    parser.add_argument('--distinct-candidates', type=int, default=0,
+                        help='number of distinct archives, 0 generates one per submission to avoid cache hits')
+    parser.add_argument('--tasks', type=int, default=2)
+    parser.add_argument('--lines', type=int, default=200)
+    parser.add_argument('--output', help='JSON file to save the results to')
+    arguments = parser.parse_args()
+
+    # use a new database and new folders, which are shared with the worker processes
+    directory = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(directory, 'load.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(directory, 'files')
+    os.environ['RESULT_FOLDER'] = os.path.join(directory, 'generated-files')
+    os.environ['UPLOAD_HANDOFF'] = 'volume'
+    os.environ['RETENTION_INTERVAL'] = '0'
+    from flask_migrate import upgrade
+    from rq import Queue
+    from werkzeug.serving import make_server
+    from app import app, db, scheduling
+    with app.app_context():
+        upgrade()
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    try:
+        app.redis.ping()
+    except Exception as error:
+        raise SystemExit('Redis is not available at ' + app.config['REDIS_URL'] + ': ' + str(error))
+    app.redis.delete(databaseSamplesKey)
+
+    # queues of this run, so that running workers of the handler do not take its jobs
+    runId = uuid.uuid4().hex[:8]
+    app.queues = {lane: Queue('qiskit-runtime-handler-load-test-' + runId + '-' + lane, connection=app.redis,
+                              default_timeout=3600)
+                  for lane in scheduling.laneQueues}
+
+    probe = DatabaseProbe()
+    probe.install(db.engine)
+
+    # candidates differ in their programs unless they are reused on purpose
+    candidateCount = arguments.distinct_candidates or max(1, int(arguments.rate * arguments.duration) + 1)
+    archives = [generate_required_programs(arguments.tasks, lines=arguments.lines, seed=candidate)
+                for candidate in range(candidateCount)]
+
+    # start the workers, the worker processes inherit the probe and the preloaded generation stack
+    queueNames = [queue.name for queue in app.queues.values()]
+    from app.worker import preload
+    preload()
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=run_worker_process, args=(queueNames, probe))
+               for worker in range(arguments.workers)]
+    for worker in workers:
+        worker.start()
+
+    # serve the web tier on the loopback interface
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    baseUrl = 'http://127.0.0.1:' + str(server.server_port)
+    os.environ['FLASK_RUN_HOST'] = '127.0.0.1'
+    os.environ['FLASK_RUN_PORT'] = str(server.server_port)
+
+    # submit candidates in fixed intervals using the generated archives in turn
+    client = LoadClient(baseUrl, arguments)
+    start = time.perf_counter()
+    submissions = 0
+    queueDepths = []
+    with ThreadPoolExecutor(max_workers=arguments.clients) as executor:
+        while time.perf_counter() - start < arguments.duration:
+            executor.submit(client.run_candidate, *archives[submissions % len(archives)])
+            submissions += 1
+            queueDepths.append(sum(queue.count for queue in app.queues.values()))
+            time.sleep(max(0.0, start + submissions / arguments.rate - time.perf_counter()))
+    end = max(client.completionTimes) if client.completionTimes else time.perf_counter()
+
+    # stop the workers and collect the statistics of their database statements
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.join()
+    server.shutdown()
+
+    writeDurations = list(probe.writeDurations)
+    lockErrors = probe.lockErrors
+    for samples in app.redis.lrange(databaseSamplesKey, 0, -1):
+        samples = json.loads(samples)
+        writeDurations.extend(samples['writeDurations'])
+        lockErrors += samples['lockErrors']
+
+    results = {'workers': arguments.workers, 'rate': arguments.rate,
+               'duration': arguments.duration, 'pollMode': arguments.poll_mode, 'submissions': submissions,
+               'completed': len(client.completionLatencies),
+               'throughput': len(client.completionLatencies) / max(end - start, 1e-9),
+               'maxQueueDepth': max(queueDepths) if queueDepths else 0,
+               'submitToComplete': summarize(client.completionLatencies),
+               'submitRequests': summarize(client.submitDurations),
+               'pollRequests': summarize(client.pollDurations),
+               'databaseWrites': dict(summarize(writeDurations), total=sum(writeDurations)),
+               'databaseLockErrors': lockErrors, 'errors': client.errors}
+
+    print('database: ' + app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0] + ', workers: ' + str(arguments.workers))
+    print('submitted: ' + str(submissions) + ', completed: ' + str(results['completed']) + ', throughput: '
+          + '{:.3f}'.format(results['throughput']) + ' candidates/s, max queue depth: '
+          + str(results['maxQueueDepth']))
+    print('submit to complete: ' + format_summary(results['submitToComplete']))
+    print('submit requests: ' + format_summary(results['submitRequests']))
+    print('poll requests: ' + format_summary(results['pollRequests']))
+    print('database writes incl. lock waits: ' + format_summary(results['databaseWrites']) + ', total '
+          + '{:.3f}'.format(results['databaseWrites']['total']) + ' s, lock errors: ' + str(lockErrors))
+    if client.errors:
+        print('errors: ' + str(client.errors))
+    if arguments.output:
+        with open(arguments.output, 'w') as outputFile:
+            json.dump(results, outputFile, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+
+"""Benchmark of the job throughput of the forking rq workers compared to the warm workers
+
+Generates hybrid programs for the same small candidate with both kinds of workers and reports the jobs per second.
+Requires a running Redis, e.g.:
+
+    REDIS_URL=redis://localhost:6379 python -m benchmarks.worker_throughput --jobs 50 --processes 2
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+
+# queue used by the benchmark, so that running workers of the handler do not take its jobs
+benchmarkQueue = 'qiskit-runtime-handler-benchmark'
+
+# programs of the tasks of the candidate
+taskPrograms = {'Task_1': '''import numpy as np
+
+
+def prepare(theta):
+    angles = np.array([theta, theta / 2])
+    return angles
+
+
+def execute(theta, shots):
+    angles = prepare(theta)
+    counts = {'0': shots}
+    return angles, counts
+
+
+if __name__ == '__main__':
+    angles, counts = execute(0.1, 1024)
+''', 'Task_2': '''def evaluate(counts):
+    value = len(counts)
+    return value
+
+
+def execute(counts):
+    theta = float(evaluate(counts))
+    return theta
+
+
+if __name__ == '__main__':
+    theta = execute({'0': 1024})
+'''}
+
+
+def create_required_programs():
+    """Create the ZIP file containing a folder with the program of each task"""
+    requiredPrograms = io.BytesIO()
+    with zipfile.ZipFile(requiredPrograms, 'w') as zipFile:
+        for task, sourceCode in taskPrograms.items():
+            zipFile.writestr(task + '/app.py', sourceCode)
+    return requiredPrograms.getvalue()
+
+
+def run_jobs(workerCommand, processes, jobs, uploadPath):
+    """Enqueue the given number of jobs and run the given worker command until all jobs are executed"""
+    from rq import Queue
+    from app import app, db
+    from app.result_model import Result
+    from app.upload_handoff import hand_off_upload
+
+    queue = Queue(benchmarkQueue, connection=app.redis)
+    reference = hand_off_upload(uploadPath, jobs)
+    resultIds = [str(uuid.uuid4()) for job in range(jobs)]
+    with app.app_context():
+        for resultId in resultIds:
+            db.session.add(Result(id=resultId))
+        db.session.commit()
+    for resultId in resultIds:
+        queue.enqueue('app.tasks.generate_hybrid_program', job_id=resultId,
+                      kwargs={'beforeLoop': 'Task_1', 'afterLoop': 'Task_2', 'loopCondition': '${theta < 1}',
+                              'requiredProgramsUrl': None, 'provenanceCollection': False,
+                              'requiredProgramsReference': reference})
+
+    start = time.perf_counter()
+    workers = [subprocess.Popen(workerCommand) for process in range(processes)]
+    for worker in workers:
+        worker.wait()
+    duration = time.perf_counter() - start
+
+    with app.app_context():
+        results = Result.query.filter(Result.id.in_(resultIds)).all()
+        completed = len([result for result in results if result.complete and not result.error])
+        db.session.remove()
+    return completed, duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=50)
+    parser.add_argument('--processes', type=int, default=1)
+    arguments = parser.parse_args()
+
+    # use a new database and new folders, the worker processes inherit the configuration
+    directory = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'benchmark.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(directory, 'files')
+    os.environ['RESULT_FOLDER'] = os.path.join(directory, 'generated-files')
+    os.environ['UPLOAD_HANDOFF'] = 'volume'
+    from flask_migrate import upgrade
+    from app import app
+    with app.app_context():
+        upgrade()
+
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    uploadPath = os.path.join(app.config['UPLOAD_FOLDER'], 'required-programs-benchmark.zip')
+    with open(uploadPath, 'wb') as file:
+        file.write(create_required_programs())
+
+    # the forking workers run one process per worker, the warm workers one pool containing all workers
+    redisUrl = app.config['REDIS_URL']
+    modes = [('forking', ['rq', 'worker', '--burst', '--url', redisUrl, benchmarkQueue], arguments.processes),
+             ('warm', [sys.executable, '-m', 'app.worker', '--burst', '--processes', str(arguments.processes),
+                       benchmarkQueue], 1)]
+    for mode, workerCommand, processes in modes:
+        completed, duration = run_jobs(workerCommand, processes, arguments.jobs, uploadPath)
+        print(mode + ' workers: ' + str(completed) + ' of ' + str(arguments.jobs) + ' jobs completed in '
+              + '{:.2f}'.format(duration) + ' s (' + '{:.2f}'.format(completed / duration) + ' jobs/s)')
+
+
+if __name__ == '__main__':
+    main()
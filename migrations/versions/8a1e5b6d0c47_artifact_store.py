@@ -0,0 +1,66 @@
+"""artifact store
+
+Revision ID: 8a1e5b6d0c47
+Revises: 4f7d2c9a1b3e
+Create Date: 2026-10-18 01:31:05.208114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.artifact_store import get_artifact_store
+
+
+# revision identifiers, used by Alembic.
+revision = '8a1e5b6d0c47'
+down_revision = '4f7d2c9a1b3e'
+branch_labels = None
+depends_on = None
+
+result = sa.table('result', sa.column('id', sa.String), sa.column('program', sa.LargeBinary),
+                  sa.column('agent', sa.LargeBinary), sa.column('program_hash', sa.String),
+                  sa.column('program_size', sa.Integer), sa.column('agent_hash', sa.String),
+                  sa.column('agent_size', sa.Integer))
+
+
+def upgrade():
+    with op.batch_alter_table('result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('program_size', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('agent_size', sa.Integer(), nullable=True))
+
+    # move the artifacts of existing results to the artifact store one result at a time
+    connection = op.get_bind()
+    artifactStore = get_artifact_store()
+    resultIds = [row.id for row in connection.execute(sa.select([result.c.id]).where(result.c.program.isnot(None)))]
+    for resultId in resultIds:
+        row = connection.execute(sa.select([result.c.program, result.c.agent])
+                                 .where(result.c.id == resultId)).fetchone()
+        connection.execute(result.update().where(result.c.id == resultId)
+                           .values(program_hash=artifactStore.put_artifact(row.program),
+                                   program_size=len(row.program),
+                                   agent_hash=artifactStore.put_artifact(row.agent),
+                                   agent_size=len(row.agent)))
+
+    with op.batch_alter_table('result', schema=None) as batch_op:
+        batch_op.drop_column('agent')
+        batch_op.drop_column('program')
+
+
+def downgrade():
+    with op.batch_alter_table('result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('program', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('agent', sa.LargeBinary(), nullable=True))
+
+    # move the artifacts back into the database, they are kept in the artifact store
+    connection = op.get_bind()
+    artifactStore = get_artifact_store()
+    rows = connection.execute(sa.select([result.c.id, result.c.program_hash, result.c.agent_hash])
+                              .where(result.c.program_hash.isnot(None))).fetchall()
+    for row in rows:
+        connection.execute(result.update().where(result.c.id == row.id)
+                           .values(program=artifactStore.read_artifact(row.program_hash),
+                                   agent=artifactStore.read_artifact(row.agent_hash)))
+
+    with op.batch_alter_table('result', schema=None) as batch_op:
+        batch_op.drop_column('agent_size')
+        batch_op.drop_column('program_size')
@@ -0,0 +1,125 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+"""Parity of the RedBaron and libcst engines, which have to generate the same hybrid programs"""
+import io
+import zipfile
+
+import pytest
+
+from app import app
+from app.hybrid_program_generation import hybrid_program_generator
+from benchmarks.corpus import generate_program
+
+# task programs with imports that are shared, aliased, or only used by helper methods
+optimizerProgram = '''import numpy as np
+from scipy.optimize import minimize
+from qiskit import QuantumCircuit
+import qiskit
+
+
+def cost(circuit, backend, theta):
+    circuit.rx(theta, 0)
+    job = qiskit.execute(circuit, backend, shots=1024)
+    counts = job.result().get_counts()
+    return counts.get('0', 0) / 1024
+
+
+def execute(theta, backend):
+    circuit = QuantumCircuit(1, 1)
+    circuit.measure(0, 0)
+    value = cost(circuit, backend, theta)
+    theta = minimize(lambda x: np.abs(x - value), theta).x[0]
+    return theta, value
+
+
+if __name__ == '__main__':
+    theta, value = execute(0.5, None)
+'''
+
+evaluatorProgram = '''import numpy as np
+from qiskit import QuantumCircuit, transpile
+import qiskit
+import json as serializer
+
+
+def execute(value, shots, backend):
+    circuit = QuantumCircuit(2)
+    circuit.h(0)
+    circuit = transpile(circuit)
+    job = qiskit.execute(circuit, backend, shots=shots)
+    counts = job.result().get_counts()
+    value = float(np.mean([value, len(counts)]))
+    serialized = serializer.dumps(counts)
+    return value
+
+
+if __name__ == '__main__':
+    value = execute(0.5, 1024, None)
+'''
+
+samplePrograms = {'Optimize': optimizerProgram,
+                  'Evaluate': evaluatorProgram,
+                  'Generated': generate_program(helperMethods=4, callDepth=2, executeSites=2, lines=200)}
+
+
+@pytest.fixture(autouse=True)
+def analyse_in_process(monkeypatch):
+    """Analyse the programs in this process without the analysis cache shared via Redis"""
+    monkeypatch.setitem(app.config, 'ANALYSIS_CACHE_TTL', 0)
+    monkeypatch.setitem(app.config, 'ANALYSIS_PROCESSES', 1)
+
+
+def generate(engine, beforeLoop, afterLoop, loopCondition='${value < 1}', provenanceCollection=False):
+    """Get the files of the hybrid program generated with the given engine"""
+    taskIdProgramMap = {task: {'fileName': 'app.py', 'sourceCode': sourceCode}
+                        for task, sourceCode in samplePrograms.items()}
+    result = hybrid_program_generator.create_hybrid_program(beforeLoop, afterLoop, loopCondition, taskIdProgramMap,
+                                                            provenanceCollection, 'job', engine)
+    assert 'error' not in result, result.get('error')
+    with zipfile.ZipFile(io.BytesIO(result['program'])) as programZip:
+        return {name: programZip.read(name).decode('utf-8') for name in programZip.namelist()}
+
+
+def assert_same_program(beforeLoop, afterLoop, **kwargs):
+    redbaronProgram = generate('redbaron', beforeLoop, afterLoop, **kwargs)
+    libcstProgram = generate('libcst', beforeLoop, afterLoop, **kwargs)
+    assert redbaronProgram['hybrid_program.json'] == libcstProgram['hybrid_program.json']
+    assert redbaronProgram['hybrid_program.py'] == libcstProgram['hybrid_program.py']
+    compile(libcstProgram['hybrid_program.py'], 'hybrid_program.py', 'exec')
+    return libcstProgram
+
+
+@pytest.mark.parametrize('beforeLoop,afterLoop', [('Optimize', 'null'),
+                                                  ('Optimize', 'Evaluate'),
+                                                  ('Generated', 'Optimize,Evaluate')])
+def test_programs_with_imports(beforeLoop, afterLoop):
+    program = assert_same_program(beforeLoop, afterLoop)['hybrid_program.py']
+    assert 'from scipy.optimize import minimize' in program
+
+
+@pytest.mark.parametrize('loopCondition', ['${value < 1}', '${value < 1 and theta > 0.1}', 'abs(value - 0.5) > 0.01'])
+def test_loop_condition(loopCondition):
+    program = assert_same_program('Optimize', 'Evaluate', loopCondition=loopCondition)['hybrid_program.py']
+    assert 'if not ' + loopCondition.replace('${', '').replace('}', '') + ':' in program
+
+
+def test_provenance_collection():
+    program = assert_same_program('Optimize', 'Evaluate', provenanceCollection=True)['hybrid_program.py']
+    assert 'user_messenger.publish("activeTask: Optimize")' in program
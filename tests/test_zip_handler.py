@@ -0,0 +1,59 @@
+# ******************************************************************************
+#  Copyright (c) 2021 University of Stuttgart
+#
+#  See the NOTICE file(s) distributed with this work for additional
+#  information regarding copyright ownership.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ******************************************************************************
+
+"""Reproducibility of the generated artifacts, which are addressed by the hash of their content"""
+import time
+
+import pytest
+
+from app import app
+from app.artifact_store import get_content_hash
+from app.hybrid_program_generation import hybrid_program_generator
+from benchmarks.corpus import generate_program
+
+
+@pytest.fixture(autouse=True)
+def analyse_in_process(monkeypatch):
+    """Analyse the programs in this process without the analysis cache shared via Redis"""
+    monkeypatch.setitem(app.config, 'ANALYSIS_CACHE_TTL', 0)
+    monkeypatch.setitem(app.config, 'ANALYSIS_PROCESSES', 1)
+
+
+def generate(jobId):
+    taskIdProgramMap = {'Task_' + str(task): {'fileName': 'app.py', 'sourceCode': generate_program(lines=100,
+                                                                                                   seed=task)}
+                        for task in range(2)}
+    result = hybrid_program_generator.create_hybrid_program('Task_0', 'Task_1', '${value < 1}', taskIdProgramMap,
+                                                            False, jobId, 'libcst')
+    assert 'error' not in result, result.get('error')
+    return get_content_hash(result['program']), get_content_hash(result['agent'])
+
+
+def test_identical_inputs_result_in_identical_artifacts(monkeypatch):
+    programHash, agentHash = generate('job')
+
+    # entries must not contain the time of the generation
+    currentTime = time.time()
+    monkeypatch.setattr(time, 'time', lambda: currentTime + 86400)
+    assert generate('job') == (programHash, agentHash)
+
+
+def test_programs_do_not_depend_on_the_job():
+    # the agent contains the ID of the job, the program can be shared by the results of multiple jobs
+    assert generate('job')[0] == generate('other-job')[0]